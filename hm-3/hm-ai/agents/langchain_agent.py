@@ -4,6 +4,7 @@ load_dotenv()
 import asyncio
 import websockets
 from langchain_openai import ChatOpenAI
+from llm_client import openai_options
 
 SYSTEM_PROMPT = """You are a fitness planning assistant. Create personalized plans that include:
 1. Weekly workout schedule
@@ -14,7 +15,7 @@ Keep recommendations practical and achievable."""
 
 async def run_planner():
     # Initialize the language model
-    llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7)
+    llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7, **openai_options())
     
     while True:
         try:
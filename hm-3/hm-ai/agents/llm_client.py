@@ -0,0 +1,298 @@
+"""Shared HTTP clients for the agents' LLM calls.
+
+The planner (LangChain/OpenAI) and the reviewer (pydantic_ai/Gemini) take their
+HTTP clients from here: one pooled keep-alive client per process, explicit
+timeouts, and retries with exponential backoff on 429/5xx and network errors
+(Retry-After honoured).
+
+LLM_MODE switches the transport for offline benchmarks:
+- record: requests go to the provider and every response is saved to
+  LLM_CASSETTE_DIR with its latency
+- replay: responses are served from LLM_CASSETTE_DIR with their recorded
+  latency (scaled by LLM_REPLAY_SPEED, 0 = no delay) and no network access;
+  retry waits after recorded 429/5xx are scaled the same way
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import httpx
+
+CASSETTE_DIR = "llm_cassettes"
+
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 30.0
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 60.0
+MAX_RETRIES = 3
+BASE_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+def llm_mode() -> str:
+    return os.getenv("LLM_MODE", "live").lower()
+
+class CassetteMiss(httpx.TransportError):
+    """No recorded response for a request in replay mode (never retried)."""
+
+class Cassette:
+    """Recorded responses on disk, one JSON file per distinct request.
+
+    Identical requests are recorded in order and replayed in the same order;
+    the last response repeats once they run out.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._cursors: Dict[str, int] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(request: httpx.Request, body: bytes) -> str:
+        digest = hashlib.sha256(f"{request.method} {request.url.path}?{request.url.query.decode()}\n".encode())
+        digest.update(body)
+        return digest.hexdigest()[:32]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load(self, key: str) -> List[Dict]:
+        if not os.path.exists(self._path(key)):
+            return []
+        with open(self._path(key)) as f:
+            return json.load(f)
+
+    def next(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entries = self._load(key)
+            if not entries:
+                return None
+            position = self._cursors.get(key, 0)
+            self._cursors[key] = position + 1
+            return entries[min(position, len(entries) - 1)]
+
+    def save(self, key: str, entry: Dict):
+        with self._lock:
+            # Re-recording starts each request's sequence from scratch
+            entries = self._load(key) if key in self._cursors else []
+            self._cursors[key] = len(entries) + 1
+            with open(self._path(key), "w") as f:
+                json.dump(entries + [entry], f)
+
+    @staticmethod
+    def entry(request: httpx.Request, response: httpx.Response, raw: bytes,
+              latency: float, body_time: float) -> Dict:
+        return {
+            "request": f"{request.method} {request.url.path}",
+            "status": response.status_code,
+            "headers": response.headers.multi_items(),
+            "body": base64.b64encode(raw).decode(),
+            "latency": round(latency, 4),
+            "body_time": round(body_time, 4),
+        }
+
+    @staticmethod
+    def response(request: httpx.Request, entry: Dict) -> httpx.Response:
+        # Raw (still encoded) bytes, so the recorded headers stay valid
+        return httpx.Response(entry["status"], headers=entry["headers"],
+                              stream=httpx.ByteStream(base64.b64decode(entry["body"])), request=request)
+
+class RecordReplayTransport(httpx.BaseTransport):
+    def __init__(self, mode: str, cassette: Cassette, transport: Optional[httpx.BaseTransport], speed: float):
+        self.mode = mode
+        self.cassette = cassette
+        self.transport = transport
+        self.speed = speed
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key = Cassette.key(request, request.read())
+        if self.mode == "replay":
+            entry = self.cassette.next(key)
+            if entry is None:
+                raise CassetteMiss(f"No recorded response for {request.method} {request.url}", request=request)
+            time.sleep((entry["latency"] + entry["body_time"]) * self.speed)
+            return Cassette.response(request, entry)
+
+        started = time.perf_counter()
+        response = self.transport.handle_request(request)
+        latency = time.perf_counter() - started
+        try:
+            raw = b"".join(response.iter_raw())
+        finally:
+            response.close()
+        entry = Cassette.entry(request, response, raw, latency, time.perf_counter() - started - latency)
+        self.cassette.save(key, entry)
+        return Cassette.response(request, entry)
+
+    def close(self):
+        if self.transport:
+            self.transport.close()
+
+class AsyncRecordReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, mode: str, cassette: Cassette, transport: Optional[httpx.AsyncBaseTransport], speed: float):
+        self.mode = mode
+        self.cassette = cassette
+        self.transport = transport
+        self.speed = speed
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = Cassette.key(request, await request.aread())
+        if self.mode == "replay":
+            entry = self.cassette.next(key)
+            if entry is None:
+                raise CassetteMiss(f"No recorded response for {request.method} {request.url}", request=request)
+            await asyncio.sleep((entry["latency"] + entry["body_time"]) * self.speed)
+            return Cassette.response(request, entry)
+
+        started = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        latency = time.perf_counter() - started
+        try:
+            raw = b"".join([chunk async for chunk in response.aiter_raw()])
+        finally:
+            await response.aclose()
+        entry = Cassette.entry(request, response, raw, latency, time.perf_counter() - started - latency)
+        self.cassette.save(key, entry)
+        return Cassette.response(request, entry)
+
+    async def aclose(self):
+        if self.transport:
+            await self.transport.aclose()
+
+def retry_delay(response: Optional[httpx.Response], attempt: int, scale: float = 1.0) -> float:
+    """Use the server's Retry-After if given, else exponential backoff with jitter.
+
+    scale is the replay speed when replaying, so recorded 429/5xx don't stall replays.
+    """
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_BACKOFF) * scale
+        except ValueError:
+            pass
+    return min(BASE_BACKOFF * 2 ** attempt, MAX_BACKOFF) * random.uniform(0.5, 1.0) * scale
+
+class RetryTransport(httpx.BaseTransport):
+    def __init__(self, transport: httpx.BaseTransport, max_retries: int, delay_scale: float = 1.0):
+        self.transport = transport
+        self.max_retries = max_retries
+        self.delay_scale = delay_scale
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.transport.handle_request(request)
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(retry_delay(None, attempt, self.delay_scale))
+                continue
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+            response.close()
+            time.sleep(retry_delay(response, attempt, self.delay_scale))
+        return response
+
+    def close(self):
+        self.transport.close()
+
+class AsyncRetryTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_retries: int, delay_scale: float = 1.0):
+        self.transport = transport
+        self.max_retries = max_retries
+        self.delay_scale = delay_scale
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.transport.handle_async_request(request)
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(retry_delay(None, attempt, self.delay_scale))
+                continue
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+            await response.aclose()
+            await asyncio.sleep(retry_delay(response, attempt, self.delay_scale))
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(float(os.getenv("LLM_TIMEOUT", READ_TIMEOUT)), connect=CONNECT_TIMEOUT)
+
+def _cassette() -> Cassette:
+    return Cassette(os.getenv("LLM_CASSETTE_DIR", CASSETTE_DIR))
+
+def _replay_speed() -> float:
+    return float(os.getenv("LLM_REPLAY_SPEED", 1.0))
+
+def _retry_scale() -> float:
+    # Replayed rate limits wait as long as the replayed latencies do
+    return _replay_speed() if llm_mode() == "replay" else 1.0
+
+def _max_retries() -> int:
+    return int(os.getenv("LLM_MAX_RETRIES", MAX_RETRIES))
+
+@lru_cache(maxsize=None)
+def http_client() -> httpx.Client:
+    """Process-wide pooled sync client."""
+    mode = llm_mode()
+    # Pool limits belong to the innermost transport once transports are wrapped
+    transport = None if mode == "replay" else httpx.HTTPTransport(limits=_limits())
+    if mode in ("record", "replay"):
+        transport = RecordReplayTransport(mode, _cassette(), transport, _replay_speed())
+    return httpx.Client(transport=RetryTransport(transport, _max_retries(), _retry_scale()), timeout=_timeout())
+
+@lru_cache(maxsize=None)
+def async_http_client() -> httpx.AsyncClient:
+    """Process-wide pooled async client."""
+    mode = llm_mode()
+    transport = None if mode == "replay" else httpx.AsyncHTTPTransport(limits=_limits())
+    if mode in ("record", "replay"):
+        transport = AsyncRecordReplayTransport(mode, _cassette(), transport, _replay_speed())
+    return httpx.AsyncClient(transport=AsyncRetryTransport(transport, _max_retries(), _retry_scale()),
+                             timeout=_timeout())
+
+def openai_options() -> Dict:
+    """Keyword arguments for ChatOpenAI; retries happen in the transport."""
+    options = {
+        "http_client": http_client(),
+        "http_async_client": async_http_client(),
+        "max_retries": 0,
+    }
+    if llm_mode() == "replay" and not os.getenv("OPENAI_API_KEY"):
+        # Replay never reaches the API, so no key is needed
+        options["api_key"] = "replay"
+    return options
+
+def gemini_model(model_name: str):
+    """pydantic_ai Gemini model on the shared async client."""
+    from pydantic_ai.models.gemini import GeminiModel
+    from pydantic_ai.providers.google_gla import GoogleGLAProvider
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if llm_mode() == "replay" and not api_key:
+        api_key = "replay"
+    provider = GoogleGLAProvider(api_key=api_key, http_client=async_http_client())
+    return GeminiModel(model_name, provider=provider)
@@ -1,17 +1,29 @@
 import asyncio
 import os
+import time
+from typing import List
 import websockets
 from dotenv import load_dotenv
+from pydantic import BaseModel
 from pydantic_ai import Agent
+from llm_client import gemini_model
 
 load_dotenv()
 
+# Opt-in micro-batching: collect up to REVIEW_BATCH_SIZE plans for at most
+# REVIEW_BATCH_WINDOW seconds and review them in one call (1 = no batching)
+BATCH_SIZE = int(os.getenv("REVIEW_BATCH_SIZE", 1))
+BATCH_WINDOW = float(os.getenv("REVIEW_BATCH_WINDOW", 2.0))
+
 # Ensure logs directory exists
 os.makedirs("logs", exist_ok=True)
 
+# Both reviewers share one pooled client
+model = gemini_model("gemini-1.5-flash")
+
 # Initialize the reviewer agent
 reviewer = Agent(
-    "google-gla:gemini-1.5-flash",
+    model,
     system_prompt="""You are a fitness plan reviewer. For each plan:
 1. Check if the plan is realistic and matches the user's request
 2. Verify the exercises are safe and appropriate
@@ -24,6 +36,83 @@ Respond with either:
 End with one practical tip for better results."""
 )
 
+class PlanVerdict(BaseModel):
+    request_id: int
+    review: str
+
+# Same instructions, but for several numbered plans in one call
+batch_reviewer = Agent(
+    model,
+    output_type=List[PlanVerdict],
+    system_prompt="""You are a fitness plan reviewer. You get several plans, each marked with a request id.
+For each plan:
+1. Check if the plan is realistic and matches the user's request
+2. Verify the exercises are safe and appropriate
+3. Validate the nutrition guidelines
+
+Return one verdict per request id. Each review starts with either:
+✅ APPROVED - if the plan is good
+🔧 NEEDS REVISION - with specific points to improve
+
+End each review with one practical tip for better results."""
+)
+
+def log_review(plan, review):
+    with open("logs/reviews.log", "a", encoding="utf-8") as f:
+        f.write("\n=== Plan ===\n" + plan +
+              "\n=== Review ===\n" + review + "\n")
+
+async def review_batch(plans):
+    """Review several plans in one call, falling back to one call per plan."""
+    if len(plans) == 1:
+        return [(await reviewer.run(plans[0])).output]
+
+    prompt = "\n\n".join(f"=== Request {i} ===\n{plan}" for i, plan in enumerate(plans))
+    try:
+        result = await batch_reviewer.run(prompt)
+        verdicts = {verdict.request_id: verdict.review for verdict in result.output}
+    except Exception as e:
+        print(f"[Reviewer] Batch review failed, reviewing one by one: {e}")
+        verdicts = {}
+
+    reviews = []
+    for i, plan in enumerate(plans):
+        if i not in verdicts:
+            # Missing or unparsable verdict for this plan; a failure here only affects this plan
+            try:
+                verdicts[i] = (await reviewer.run(plan)).output
+            except Exception as e:
+                verdicts[i] = f"Error reviewing plan: {str(e)}"
+                print(f"[Reviewer] {verdicts[i]}")
+        reviews.append(verdicts[i])
+    return reviews
+
+async def run_batches(ws, queue):
+    """Collect queued plans into batches and send every review to the user."""
+    while True:
+        plans = [await queue.get()]
+        deadline = time.monotonic() + BATCH_WINDOW
+        while len(plans) < BATCH_SIZE:
+            try:
+                plans.append(await asyncio.wait_for(queue.get(), deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                break
+
+        print(f"[Reviewer] Reviewing batch of {len(plans)} plan(s)")
+        try:
+            reviews = await review_batch(plans)
+        except Exception as e:
+            error_msg = f"Error reviewing plan: {str(e)}"
+            print(f"[Reviewer] {error_msg}")
+            for _ in plans:
+                await ws.send(f"send:user:{error_msg}")
+            continue
+
+        for plan, review in zip(plans, reviews):
+            await ws.send(f"send:user:{review}")
+            log_review(plan, review)
+        print(f"[Reviewer] {len(reviews)} review(s) sent to user")
+
 async def run_reviewer():
     while True:
         try:
@@ -33,12 +122,22 @@ async def run_reviewer():
                 await ws.send("register:reviewer")
                 print("[Reviewer] Connected and waiting for plans...")
 
+                batches = None
+                if BATCH_SIZE > 1:
+                    queue = asyncio.Queue()
+                    batches = asyncio.create_task(run_batches(ws, queue))
+                    print(f"[Reviewer] Batching up to {BATCH_SIZE} plans per {BATCH_WINDOW}s")
+
                 while True:
                     try:
                         # Receive fitness plan
                         plan = await ws.recv()
                         print("[Reviewer] Received plan for review")
 
+                        if batches:
+                            queue.put_nowait(plan)
+                            continue
+
                         # Review the plan
                         review = await reviewer.run(plan)
                         
@@ -47,12 +146,12 @@ async def run_reviewer():
                         print("[Reviewer] Review sent to user")
 
                         # Log the interaction
-                        with open("logs/reviews.log", "a", encoding="utf-8") as f:
-                            f.write("\n=== Plan ===\n" + plan +
-                                  "\n=== Review ===\n" + review.output + "\n")
+                        log_review(plan, review.output)
 
                     except websockets.exceptions.ConnectionClosed:
                         print("[Reviewer] Connection lost, attempting to reconnect...")
+                        if batches:
+                            batches.cancel()
                         break
                     except Exception as e:
                         error_msg = f"Error reviewing plan: {str(e)}"
@@ -0,0 +1,219 @@
+"""Local broker that lets several ws_server workers act as one router.
+
+Every worker connects to the broker over a Unix socket and exchanges
+newline-delimited JSON messages with it:
+- "register"/"unregister" keep one agent registry (agent name -> worker)
+  shared by all workers
+- "forward" carries a send: message to the worker the target agent is
+  connected to ("deliver"), or back to the sender's worker if nobody owns
+  the target anymore ("undeliverable")
+- "metrics" collects every worker's raw metrics state, so whichever worker
+  serves /metrics can report for the whole router
+"""
+
+import asyncio
+import json
+import logging
+import os
+
+logger = logging.getLogger("a2a.broker")
+
+# Routed payloads travel as one JSON line, so allow big plans
+STREAM_LIMIT = 64 * 1024 * 1024
+# How long a worker waits for the other workers' metrics
+METRICS_TIMEOUT = 2.0
+
+
+def encode(message):
+    return (json.dumps(message) + "\n").encode()
+
+
+class Broker:
+    """Runs in the parent process and relays messages between workers."""
+
+    def __init__(self):
+        self.workers = {}  # worker id -> StreamWriter
+        self.owners = {}   # agent name -> worker id
+        self.polls = {}    # "<origin>:<poll>" -> metrics poll waiting for workers
+
+    async def serve(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self.handle_worker, path, limit=STREAM_LIMIT)
+        logger.info("Broker listening on %s", path)
+        return server
+
+    async def send(self, worker_id, message):
+        writer = self.workers.get(worker_id)
+        if writer is None:
+            return False
+        try:
+            writer.write(encode(message))
+            await writer.drain()
+        except ConnectionError as e:
+            # Only that worker is gone; its own handler unregisters its agents
+            logger.warning("Worker %s unreachable: %s", worker_id, e)
+            if self.workers.get(worker_id) is writer:
+                del self.workers[worker_id]
+            writer.close()
+            return False
+        return True
+
+    async def broadcast(self, message):
+        for worker_id in list(self.workers):
+            await self.send(worker_id, message)
+
+    async def poll_metrics(self, origin, poll):
+        key = f"{origin}:{poll}"
+        self.polls[key] = {"origin": origin, "poll": poll, "waiting": set(self.workers), "states": []}
+        for worker_id in list(self.workers):
+            if not await self.send(worker_id, {"op": "metrics_request", "poll": key}):
+                await self.metrics_done(key, worker_id)
+
+    async def metrics_done(self, key, worker_id, state=None):
+        """worker_id answered the poll (or is gone); reply to the origin once all have."""
+        poll = self.polls.get(key)
+        if poll is None or worker_id not in poll["waiting"]:
+            return
+        poll["waiting"].discard(worker_id)
+        if state is not None:
+            poll["states"].append(state)
+        if not poll["waiting"]:
+            del self.polls[key]
+            await self.send(poll["origin"], {"op": "metrics", "poll": poll["poll"], "states": poll["states"]})
+
+    async def handle_worker(self, reader, writer):
+        worker_id = None
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                op = message["op"]
+
+                if op == "hello":
+                    worker_id = message["worker"]
+                    self.workers[worker_id] = writer
+                    await self.send(worker_id, {"op": "registry", "agents": self.owners})
+                    logger.info("Worker %s connected", worker_id)
+
+                elif op == "register":
+                    self.owners[message["agent"]] = worker_id
+                    await self.broadcast({"op": "register", "agent": message["agent"], "worker": worker_id})
+
+                elif op == "unregister":
+                    # Ignore it if the agent already re-registered on another worker
+                    if self.owners.get(message["agent"]) == worker_id:
+                        del self.owners[message["agent"]]
+                        await self.broadcast({"op": "unregister", "agent": message["agent"], "worker": worker_id})
+
+                elif op == "forward":
+                    owner = self.owners.get(message["target"])
+                    message["origin"] = worker_id
+                    if owner is None or not await self.send(owner, dict(message, op="deliver")):
+                        await self.send(worker_id, dict(message, op="undeliverable"))
+
+                elif op == "undeliverable":
+                    await self.send(message["origin"], message)
+
+                elif op == "metrics":
+                    await self.poll_metrics(worker_id, message["poll"])
+
+                elif op == "metrics_state":
+                    await self.metrics_done(message["poll"], worker_id, message["state"])
+
+        except (ConnectionError, json.JSONDecodeError) as e:
+            logger.warning("Worker %s connection error: %s", worker_id, e)
+        finally:
+            # A send() that failed may already have dropped this writer
+            if worker_id is not None and self.workers.get(worker_id, writer) is writer:
+                self.workers.pop(worker_id, None)
+                for agent in [name for name, owner in self.owners.items() if owner == worker_id]:
+                    del self.owners[agent]
+                    await self.broadcast({"op": "unregister", "agent": agent, "worker": worker_id})
+                for key in list(self.polls):
+                    await self.metrics_done(key, worker_id)
+                logger.info("Worker %s disconnected", worker_id)
+            writer.close()
+
+
+class BrokerClient:
+    """Worker side of the broker connection."""
+
+    def __init__(self, worker_id, on_deliver, on_undeliverable, on_metrics):
+        self.worker_id = worker_id
+        self.on_deliver = on_deliver
+        self.on_undeliverable = on_undeliverable
+        # Returns this worker's metrics state for the other workers
+        self.on_metrics = on_metrics
+        # Metrics polls this worker started: poll id -> future for all states
+        self.polls = {}
+        self.next_poll = 0
+        # Agents connected to other workers: name -> worker id
+        self.remote_agents = {}
+        self.reader = None
+        self.writer = None
+        self.listener = None
+
+    async def connect(self, path):
+        self.reader, self.writer = await asyncio.open_unix_connection(path, limit=STREAM_LIMIT)
+        await self.send({"op": "hello", "worker": self.worker_id})
+        self.listener = asyncio.create_task(self.listen())
+
+    async def send(self, message):
+        self.writer.write(encode(message))
+        await self.writer.drain()
+
+    async def register(self, agent):
+        await self.send({"op": "register", "agent": agent})
+
+    async def unregister(self, agent):
+        await self.send({"op": "unregister", "agent": agent})
+
+    async def forward(self, **fields):
+        """Fields: sender, target, payload plus anything the workers need back."""
+        await self.send(dict(fields, op="forward"))
+
+    async def reject(self, message):
+        await self.send(dict(message, op="undeliverable"))
+
+    async def gather_metrics(self, timeout=METRICS_TIMEOUT):
+        """Metrics states of all workers (this one included)."""
+        self.next_poll += 1
+        poll = self.next_poll
+        self.polls[poll] = asyncio.get_running_loop().create_future()
+        try:
+            await self.send({"op": "metrics", "poll": poll})
+            return await asyncio.wait_for(self.polls[poll], timeout)
+        finally:
+            del self.polls[poll]
+
+    async def listen(self):
+        while line := await self.reader.readline():
+            message = json.loads(line)
+            op = message["op"]
+            try:
+                if op == "registry":
+                    self.remote_agents = {
+                        agent: worker for agent, worker in message["agents"].items()
+                        if worker != self.worker_id
+                    }
+                elif op == "register":
+                    if message["worker"] == self.worker_id:
+                        self.remote_agents.pop(message["agent"], None)
+                    else:
+                        self.remote_agents[message["agent"]] = message["worker"]
+                elif op == "unregister":
+                    if self.remote_agents.get(message["agent"]) == message["worker"]:
+                        del self.remote_agents[message["agent"]]
+                elif op == "deliver":
+                    await self.on_deliver(message)
+                elif op == "undeliverable":
+                    await self.on_undeliverable(message)
+                elif op == "metrics_request":
+                    await self.send({"op": "metrics_state", "poll": message["poll"], "state": self.on_metrics()})
+                elif op == "metrics":
+                    future = self.polls.get(message["poll"])
+                    if future and not future.done():
+                        future.set_result(message["states"])
+            except Exception as e:
+                logger.warning("Worker %s failed to handle '%s': %s", self.worker_id, op, e)
+        logger.error("Worker %s lost the broker connection", self.worker_id)
@@ -0,0 +1,220 @@
+"""Offline load test for the A2A websocket pipeline.
+
+Starts ws_server.py in a subprocess, connects stub planner/reviewer agents
+that speak the same register:/send: protocol as agents/langchain_agent.py and
+agents/pydantic_reviewer.py (no LLM, just artificial latency), then drives N
+simulated main.py clients and reports throughput, round-trip latency and
+server memory per connection.
+
+The real agents always answer "user", so only one real client can talk to
+them at a time. To simulate many conversations every stub client registers as
+"user-<i>" and the stubs carry that name in front of the payload
+("user-<i>|<text>") to route the review back to the right client.
+
+Usage: python load_test.py --clients 50 --requests 20 --latency 0.05 --payload-size 2048
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import websockets
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ws_server.py")
+# Hops per conversation: user -> planner -> reviewer -> user
+HOPS_PER_REQUEST = 3
+
+
+def read_rss_kb(pid):
+    """Resident memory of a process and its children in KB (Linux only, None elsewhere)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(child) for child in f.read().split()]
+    except (OSError, StopIteration):
+        return None
+    # Worker processes when the server runs with A2A_WORKERS > 1
+    return rss + sum(read_rss_kb(child) or 0 for child in children)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[int((len(ordered) - 1) * pct)]
+
+
+async def wait_for_server(url, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            async with websockets.connect(url):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server did not start on {url}")
+            await asyncio.sleep(0.1)
+
+
+async def run_stub_agent(url, name, next_hop, latency, payload_size, sequential, ready):
+    """Stub agent: wait `latency` seconds per message, then forward it."""
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(f"register:{name}")
+        ready.set()
+
+        async def handle(message):
+            reply_to, _, text = message.partition("|")
+            await asyncio.sleep(latency)
+            if next_hop:
+                # Planner: turn the request into a "plan" of the configured size
+                body = (text + " ").ljust(payload_size, "x")
+                await ws.send(f"send:{next_hop}:{reply_to}|{body}")
+            else:
+                # Reviewer: answer the client that started the conversation
+                await ws.send(f"send:{reply_to}:✅ APPROVED ({len(text)} chars reviewed)")
+
+        tasks = set()
+        async for message in ws:
+            if sequential:
+                # Same as the real agents, which handle one message at a time
+                await handle(message)
+            else:
+                task = asyncio.create_task(handle(message))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+
+async def run_client(url, index, requests, connected, start, round_trips, errors):
+    """Simulated main.py: send a request to the planner and wait for the review."""
+    name = f"user-{index}"
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(f"register:{name}")
+        connected.append(name)
+        await start.wait()
+        for i in range(requests):
+            sent_at = time.perf_counter()
+            await ws.send(f"send:planner:{name}|Request {i}: 3 day plan with 3 kg dumbbells")
+            response = await ws.recv()
+            if response.startswith("Error:"):
+                errors.append(response)
+                continue
+            round_trips.append(time.perf_counter() - sent_at)
+
+
+def fetch_server_metrics(host, port):
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+            return json.load(response)
+    except OSError:
+        return None
+
+
+async def run_load_test(args):
+    url = f"ws://{args.host}:{args.port}"
+    # Fresh message log per run so old runs' queued messages are not replayed
+    log_dir = tempfile.TemporaryDirectory()
+    message_log = "" if args.no_message_log else os.path.join(log_dir.name, "messages.db")
+    env = dict(os.environ, A2A_HOST=args.host, A2A_PORT=str(args.port), A2A_WORKERS=str(args.workers),
+               A2A_BROKER_SOCKET=f"/tmp/a2a-broker-{args.port}.sock", A2A_MESSAGE_LOG=message_log,
+               LOG_LEVEL="WARNING")
+    server = subprocess.Popen([sys.executable, SERVER_SCRIPT], env=env)
+    agents = []
+    try:
+        await wait_for_server(url)
+        rss_idle = read_rss_kb(server.pid)
+
+        for name, next_hop in (("planner", "reviewer"), ("reviewer", None)):
+            ready = asyncio.Event()
+            agents.append(asyncio.create_task(run_stub_agent(
+                url, name, next_hop, args.latency, args.payload_size, args.sequential, ready)))
+            await ready.wait()
+
+        connected, round_trips, errors = [], [], []
+        start = asyncio.Event()
+        clients = [
+            asyncio.create_task(run_client(url, i, args.requests, connected, start, round_trips, errors))
+            for i in range(args.clients)
+        ]
+        while len(connected) < args.clients:
+            await asyncio.sleep(0.05)
+        # Give the server a moment to finish registering the last clients
+        await asyncio.sleep(0.2)
+        rss_connected = read_rss_kb(server.pid)
+
+        print(f"🔹 {args.clients} clients connected, sending {args.requests} requests each...")
+        started = time.perf_counter()
+        start.set()
+        await asyncio.gather(*clients)
+        elapsed = time.perf_counter() - started
+
+        report(args, elapsed, round_trips, errors, rss_idle, rss_connected,
+               fetch_server_metrics(args.host, args.port))
+    finally:
+        for task in agents:
+            task.cancel()
+        await asyncio.gather(*agents, return_exceptions=True)
+        server.terminate()
+        server.wait()
+        log_dir.cleanup()
+
+
+def report(args, elapsed, round_trips, errors, rss_idle, rss_connected, server_metrics):
+    border = "=" * 60
+    print(f"\n{border}")
+    print("📊 A2A LOAD TEST".center(60))
+    print(border)
+    print(f"Clients: {args.clients}  Requests/client: {args.requests}  "
+          f"Agent latency: {args.latency * 1000:.0f} ms  Payload: {args.payload_size} B"
+          f"{'  (sequential agents)' if args.sequential else ''}  Server workers: {args.workers}"
+          f"{'  (no message log)' if args.no_message_log else ''}")
+    print(f"Completed conversations: {len(round_trips)}  Errors: {len(errors)}")
+    print(f"Wall time: {elapsed:.2f} s")
+    if round_trips:
+        print(f"Routed msgs/sec: {len(round_trips) * HOPS_PER_REQUEST / elapsed:.1f}")
+        print(f"Conversations/sec: {len(round_trips) / elapsed:.1f}")
+        print(f"Round trip p50: {percentile(round_trips, 0.50) * 1000:.1f} ms  "
+              f"p99: {percentile(round_trips, 0.99) * 1000:.1f} ms")
+    if rss_idle is not None and rss_connected is not None:
+        connections = args.clients + 2
+        print(f"Server RSS: {rss_idle / 1024:.1f} MB idle, {rss_connected / 1024:.1f} MB with "
+              f"{connections} connections (~{(rss_connected - rss_idle) / connections:.1f} KB/connection)")
+    else:
+        print("Server RSS: n/a (needs /proc)")
+    if server_metrics:
+        hops = {hop: stats for hop, stats in server_metrics.get("hop_latency", {}).items()
+                if stats.get("count")}
+        router_p99 = [stats["p99_ms"] for hop, stats in hops.items() if hop.startswith("router:")]
+        print("\nServer-side hop latency" + (f" ({server_metrics['workers']} workers):" if "workers" in server_metrics else ":"))
+        for hop, stats in hops.items():
+            if not hop.startswith("router:"):
+                print(f"  {hop}: p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms")
+        if router_p99:
+            print(f"  router send: worst route p99 {max(router_p99)} ms over {len(router_p99)} routes")
+    print(border)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test the A2A websocket router with stub agents")
+    parser.add_argument("--clients", type=int, default=10, help="simulated main.py clients")
+    parser.add_argument("--requests", type=int, default=10, help="requests sent by each client")
+    parser.add_argument("--latency", type=float, default=0.0, help="artificial seconds per agent hop")
+    parser.add_argument("--payload-size", type=int, default=1024, help="plan size in bytes")
+    parser.add_argument("--sequential", action="store_true",
+                        help="stub agents handle one message at a time, like the real agents")
+    parser.add_argument("--workers", type=int, default=1, help="router processes (A2A_WORKERS)")
+    parser.add_argument("--no-message-log", action="store_true", help="run the server without A2A_MESSAGE_LOG")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8766, help="port for the benchmark server")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run_load_test(parse_args()))
+    except KeyboardInterrupt:
+        print("\n👋 Load test interrupted")
@@ -0,0 +1,129 @@
+"""Durable append-only log of routed messages (SQLite in WAL mode).
+
+Every message routed to a known agent is appended before it is sent. An
+agent acknowledges the oldest message delivered to it when it sends its
+next message (the agents handle one message at a time: recv -> work ->
+send), or all of them when it closes its connection cleanly. Acks are kept
+per message: with several workers an agent can get messages out of id
+order (a forwarded one may arrive after a newer local one), so finishing a
+newer message says nothing about an older one. On re-registration every
+unacknowledged message is replayed, so requests sent while it was
+reconnecting, or lost with a crashed connection, are not dropped.
+
+Compaction removes acknowledged messages, messages older than the
+retention period and anything over the per-agent backlog limit.
+"""
+
+import sqlite3
+import time
+from collections import defaultdict, deque
+
+# Messages older than this are dropped even if never acknowledged
+RETENTION_SECONDS = 24 * 60 * 60
+# Most unacknowledged messages kept per agent
+MAX_PENDING = 1000
+
+
+class MessageStore:
+    def __init__(self, path, retention=RETENTION_SECONDS, max_pending=MAX_PENDING):
+        self.retention = retention
+        self.max_pending = max_pending
+        # Autocommit: every append/ack is its own small transaction
+        self.db = sqlite3.connect(path, isolation_level=None, timeout=10)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                target TEXT NOT NULL,
+                sender TEXT,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                acked INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS messages_target ON messages (target, id);
+            -- Known agents; acked_id is only read to migrate logs from before per-message acks
+            CREATE TABLE IF NOT EXISTS offsets (
+                agent TEXT PRIMARY KEY,
+                acked_id INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(messages)")]
+        if "acked" not in columns:
+            # Logs from before per-message acks only have each agent's offset
+            self.db.executescript("""
+                ALTER TABLE messages ADD COLUMN acked INTEGER NOT NULL DEFAULT 0;
+                UPDATE messages SET acked = 1 WHERE id <=
+                    (SELECT acked_id FROM offsets WHERE offsets.agent = messages.target);
+            """)
+        # Ids delivered to each agent (on this process) and not acknowledged yet
+        self.unacked = defaultdict(deque)
+
+    def register(self, agent):
+        """Mark the agent as known and return its messages to replay, oldest first."""
+        self.unacked[agent].clear()
+        self.db.execute("INSERT OR IGNORE INTO offsets (agent) VALUES (?)", (agent,))
+        return self.pending(agent)
+
+    def pending(self, agent, after=0):
+        """Unacknowledged messages for the agent with an id above after, oldest first."""
+        return self.db.execute(
+            "SELECT id, sender, payload, created_at FROM messages "
+            "WHERE target = ? AND id > ? AND NOT acked ORDER BY id",
+            (agent, after),
+        ).fetchall()
+
+    def is_known(self, agent):
+        return self.db.execute("SELECT 1 FROM offsets WHERE agent = ?", (agent,)).fetchone() is not None
+
+    def append(self, sender, target, payload):
+        cursor = self.db.execute(
+            "INSERT INTO messages (target, sender, payload, created_at) VALUES (?, ?, ?, ?)",
+            (target, sender, payload, time.time()),
+        )
+        return cursor.lastrowid
+
+    def delivered(self, agent, message_id):
+        self.unacked[agent].append(message_id)
+
+    def ack_next(self, agent):
+        """The agent sent a message, so it is done with the oldest one it got."""
+        if self.unacked[agent]:
+            self._ack([self.unacked[agent].popleft()])
+
+    def ack_all(self, agent):
+        if self.unacked[agent]:
+            self._ack(self.unacked[agent])
+            self.unacked[agent].clear()
+
+    def _ack(self, message_ids):
+        self.db.executemany("UPDATE messages SET acked = 1 WHERE id = ?", [(i,) for i in message_ids])
+
+    def forget(self, agent):
+        """Connection lost: unacknowledged messages stay in the log for replay."""
+        self.unacked[agent].clear()
+
+    def compact(self):
+        """Apply retention and free space. Returns the number of deleted messages."""
+        deleted = self.db.execute("DELETE FROM messages WHERE acked").rowcount
+        deleted += self.db.execute(
+            "DELETE FROM messages WHERE created_at < ?", (time.time() - self.retention,)
+        ).rowcount
+        for (target,) in self.db.execute(
+            "SELECT target FROM messages GROUP BY target HAVING COUNT(*) > ?", (self.max_pending,)
+        ).fetchall():
+            deleted += self.db.execute(
+                "DELETE FROM messages WHERE target = ? AND id NOT IN "
+                "(SELECT id FROM messages WHERE target = ? ORDER BY id DESC LIMIT ?)",
+                (target, target, self.max_pending),
+            ).rowcount
+        self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return deleted
+
+    def pending_counts(self):
+        return dict(self.db.execute(
+            "SELECT target, COUNT(*) FROM messages WHERE NOT acked GROUP BY target"
+        ).fetchall())
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,215 @@
+import time
+from collections import defaultdict, deque
+
+# How many seconds of history the msgs/sec rates are averaged over
+RATE_WINDOW = 60
+# How many latency samples are kept per hop for percentiles
+LATENCY_SAMPLES = 1024
+
+
+class RateCounter:
+    """Counts events in one-second buckets over a sliding window."""
+
+    def __init__(self, window=RATE_WINDOW):
+        self.window = window
+        self.total = 0
+        self.buckets = deque()  # [second, count]
+
+    def add(self, now):
+        second = int(now)
+        if self.buckets and self.buckets[-1][0] == second:
+            self.buckets[-1][1] += 1
+        else:
+            self.buckets.append([second, 1])
+        self.total += 1
+        self._trim(second)
+
+    def _trim(self, second):
+        while self.buckets and self.buckets[0][0] <= second - self.window:
+            self.buckets.popleft()
+
+    def state(self, now):
+        self._trim(int(now))
+        return {"total": self.total, "buckets": [list(bucket) for bucket in self.buckets]}
+
+
+def rate(buckets, now, window=RATE_WINDOW):
+    """msgs/sec over the window from [second, count] buckets (possibly from several workers)."""
+    return sum(count for second, count in buckets if second > int(now) - window) / window
+
+
+def summarize(count, samples):
+    """Percentiles of latency samples in seconds."""
+    if not samples:
+        return {"count": count}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {
+        "count": count,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": round(ordered[int(last * 0.50)] * 1000, 2),
+        "p99_ms": round(ordered[int(last * 0.99)] * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+class LatencyStats:
+    """Keeps the most recent latency samples (in seconds) for one hop."""
+
+    def __init__(self, size=LATENCY_SAMPLES):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def state(self):
+        return {"count": self.count, "samples": list(self.samples)}
+
+
+class RouterMetrics:
+    """In-process metrics for the A2A router.
+
+    Latencies are measured from the times the router sees messages:
+    - hop "<agent>": from delivering a message to an agent until that agent
+      sends its next message (time spent inside the agent)
+    - hop "router:<sender>-><target>": time spent in websocket.send()
+    - end_to_end "<agent>": from an agent sending a request until a message
+      is delivered back to it (e.g. user -> planner -> reviewer -> user)
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.routes = defaultdict(RateCounter)
+        self.errors = defaultdict(int)
+        self.queued = defaultdict(int)
+        self.agents = {}
+        self.hops = defaultdict(LatencyStats)
+        self.end_to_end = defaultdict(LatencyStats)
+        # Delivery timestamps of messages an agent is still working on
+        self.inbox = defaultdict(deque)
+        # Send timestamps of requests an agent is still waiting an answer for
+        self.awaiting = defaultdict(deque)
+
+    def agent_connected(self, name):
+        now = time.time()
+        state = self.agents.setdefault(name, {"connections": 0})
+        state.update(state="connected", since=now, last_seen=now)
+        state["connections"] += 1
+        # Anything queued for a previous connection will never be answered
+        self.inbox[name].clear()
+        self.awaiting[name].clear()
+
+    def agent_disconnected(self, name):
+        state = self.agents.get(name)
+        if state:
+            state.update(state="disconnected", since=time.time())
+        self.inbox[name].clear()
+        self.awaiting[name].clear()
+
+    def message_received(self, sender, now):
+        """Called for every send: message. Returns True if it starts a new request."""
+        if sender in self.agents:
+            self.agents[sender]["last_seen"] = now
+        if self.inbox[sender]:
+            self.hops[sender].add(now - self.inbox[sender].popleft())
+            return False
+        # Nothing pending for this agent, so it is starting a new request
+        self.awaiting[sender].append(now)
+        return True
+
+    def message_routed(self, sender, target, received_at, now):
+        self.routes[f"{sender}->{target}"].add(now)
+        self.hops[f"router:{sender}->{target}"].add(now - received_at)
+        if self.awaiting[target]:
+            self.end_to_end[target].add(now - self.awaiting[target].popleft())
+        else:
+            self.inbox[target].append(now)
+
+    def message_queued(self, target):
+        """The target is offline; the message waits in the message log."""
+        self.queued[target] += 1
+
+    def route_failed(self, sender, reason, new_request=False):
+        self.errors[reason] += 1
+        if new_request and self.awaiting[sender]:
+            # The sender gets an error back instead of an answer
+            self.awaiting[sender].pop()
+
+    def state(self):
+        """Raw counters and latency samples (JSON-safe), so workers' metrics can be merged."""
+        now = time.time()
+        return {
+            "started_at": self.started_at,
+            "routes": {route: counter.state(now) for route, counter in self.routes.items()},
+            "agents": {
+                name: {
+                    "state": state["state"],
+                    "since": state["since"],
+                    "last_seen": state["last_seen"],
+                    "connections": state["connections"],
+                    "in_flight": len(self.inbox[name]),
+                    "awaiting_reply": len(self.awaiting[name]),
+                }
+                for name, state in self.agents.items()
+            },
+            "hops": {hop: stats.state() for hop, stats in self.hops.items()},
+            "end_to_end": {name: stats.state() for name, stats in self.end_to_end.items()},
+            "errors": dict(self.errors),
+            "queued": dict(self.queued),
+        }
+
+    def snapshot(self):
+        return render(self.state())
+
+
+def merge_states(states):
+    """Combine RouterMetrics.state() of several workers into one state."""
+    merged = {"started_at": min(state["started_at"] for state in states), "routes": {}, "agents": {},
+              "hops": {}, "end_to_end": {}, "errors": defaultdict(int), "queued": defaultdict(int)}
+    for state in states:
+        for route, counter in state["routes"].items():
+            into = merged["routes"].setdefault(route, {"total": 0, "buckets": []})
+            into["total"] += counter["total"]
+            into["buckets"] += counter["buckets"]
+        for name, agent in state["agents"].items():
+            into = merged["agents"].get(name)
+            if into is None:
+                merged["agents"][name] = dict(agent)
+                continue
+            # An agent is connected to one worker at a time: the latest change of state wins
+            latest = agent if agent["since"] > into["since"] else into
+            merged["agents"][name] = dict(
+                latest,
+                last_seen=max(agent["last_seen"], into["last_seen"]),
+                connections=agent["connections"] + into["connections"],
+                in_flight=agent["in_flight"] + into["in_flight"],
+                awaiting_reply=agent["awaiting_reply"] + into["awaiting_reply"],
+            )
+        for key in ("hops", "end_to_end"):
+            for name, stats in state[key].items():
+                into = merged[key].setdefault(name, {"count": 0, "samples": []})
+                into["count"] += stats["count"]
+                into["samples"] += stats["samples"]
+        for key in ("errors", "queued"):
+            for name, count in state[key].items():
+                merged[key][name] += count
+    return merged
+
+
+def render(state):
+    """The /metrics snapshot of a RouterMetrics.state() (or a merged one)."""
+    now = time.time()
+    return {
+        "uptime_s": round(now - state["started_at"], 1),
+        "routes": {
+            route: {"total": counter["total"], "msgs_per_sec": round(rate(counter["buckets"], now), 3)}
+            for route, counter in state["routes"].items()
+        },
+        "agents": state["agents"],
+        "hop_latency": {hop: summarize(**stats) for hop, stats in state["hops"].items()},
+        "end_to_end_latency": {name: summarize(**stats) for name, stats in state["end_to_end"].items()},
+        "errors": dict(state["errors"]),
+        "queued": dict(state["queued"]),
+    }
@@ -1,56 +1,283 @@
 import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from http import HTTPStatus
+
 import websockets
 
+from broker import Broker, BrokerClient
+from message_store import MessageStore
+from metrics import RouterMetrics, merge_states, render
+
+HOST = os.getenv("A2A_HOST", "localhost")
+PORT = int(os.getenv("A2A_PORT", 8765))
+# With more than one worker, each runs its own router on the same port
+# (SO_REUSEPORT) and they share agents through a broker on a Unix socket
+WORKERS = int(os.getenv("A2A_WORKERS", 1))
+BROKER_SOCKET = os.getenv("A2A_BROKER_SOCKET", "/tmp/a2a-broker.sock")
+# Durable message log so messages for reconnecting agents are not lost
+# (set A2A_MESSAGE_LOG= to disable)
+MESSAGE_LOG = os.getenv("A2A_MESSAGE_LOG", "a2a_messages.db")
+COMPACT_INTERVAL = 60
+
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s [Server] " + ("%(processName)s " if WORKERS > 1 else "") + "%(levelname)s: %(message)s",
+)
+logger = logging.getLogger("a2a.server")
+# websockets logs every connection (and every /metrics scrape) at INFO
+logging.getLogger("websockets").setLevel(max(logging.WARNING, logging.getLogger().level))
+
 # Store agent connections
 agents = {}
+metrics = RouterMetrics()
+# Set in worker processes when running with several workers
+broker = None
+# Open connections by id, so errors for forwarded messages find their sender
+connections = {}
+# MessageStore, opened in serve() unless MESSAGE_LOG is empty
+store = None
+
+async def deliver(target, sender, payload, message_id, received_at):
+    """Send a message to a local agent. Returns False if it is disconnecting."""
+    try:
+        await agents[target].send(payload)
+    except (KeyError, websockets.exceptions.ConnectionClosed):
+        if message_id is None:
+            raise
+        # Still in the log, so it is replayed when the agent registers again
+        logger.info("Agent '%s' disconnected, message %s kept for replay", target, message_id)
+        return False
+    if message_id is not None:
+        store.delivered(target, message_id)
+    metrics.message_routed(sender, target, received_at, time.time())
+    return True
+
+async def replay(websocket, agent_name):
+    """Send the agent its logged messages, including any queued while replaying.
+
+    Returns the last replayed id. The final check for new messages and the
+    caller publishing the agent happen without an await in between.
+    """
+    batch = store.register(agent_name)
+    last_id = replayed = 0
+    while batch:
+        for message_id, sender, payload, created_at in batch:
+            await websocket.send(payload)
+            store.delivered(agent_name, message_id)
+            metrics.message_routed(sender, agent_name, created_at, time.time())
+            last_id = message_id
+        replayed += len(batch)
+        batch = store.pending(agent_name, last_id)
+    if replayed:
+        logger.info("Replayed %d queued message(s) to '%s'", replayed, agent_name)
+    return last_id
 
 async def handle_connection(websocket):
     agent_name = None
+    connections[id(websocket)] = websocket
     try:
         async for message in websocket:
             # Handle agent registration
             if message.startswith("register:"):
                 agent_name = message.split(":", 1)[1]
+                last_replayed = 0
+                if store:
+                    # Replay before the agent is published, so live messages can't
+                    # overtake or duplicate replayed ones
+                    last_replayed = await replay(websocket, agent_name)
                 agents[agent_name] = websocket
-                print(f"[Server] Agent '{agent_name}' registered")
+                metrics.agent_connected(agent_name)
+                if broker:
+                    await broker.register(agent_name)
+                    if store:
+                        # Other workers queued messages until they learned of the agent
+                        delivered = set(store.unacked[agent_name])
+                        for message_id, sender, payload, created_at in store.pending(agent_name, last_replayed):
+                            if message_id not in delivered:
+                                await deliver(agent_name, sender, payload, message_id, created_at)
+                logger.info("Agent '%s' registered", agent_name)
                 continue
 
             # Handle message routing between agents
             if message.startswith("send:"):
+                received_at = time.time()
                 try:
                     _, target_agent, payload = message.split(":", 2)
-                    if target_agent in agents:
-                        await agents[target_agent].send(payload)
-                        print(f"[Server] Message routed: {agent_name} → {target_agent}")
-                    else:
-                        print(f"[Server] Error: Target agent '{target_agent}' not found")
-                        await websocket.send(f"Error: Agent '{target_agent}' not available")
                 except ValueError:
-                    print("[Server] Error: Invalid message format")
+                    metrics.route_failed(agent_name, "invalid_format")
+                    logger.warning("Invalid message format")
                     await websocket.send("Error: Invalid message format")
+                    continue
+
+                new_request = metrics.message_received(agent_name, received_at)
+                local = target_agent in agents
+                remote = broker is not None and target_agent in broker.remote_agents
+                message_id = None
+                if store:
+                    # Sending means the agent is done with the oldest message it got
+                    store.ack_next(agent_name)
+                    if local or remote or store.is_known(target_agent):
+                        message_id = store.append(agent_name, target_agent, payload)
+
+                if local:
+                    await deliver(target_agent, agent_name, payload, message_id, received_at)
+                    logger.debug("Message routed: %s → %s", agent_name, target_agent)
+                elif remote:
+                    # Routed metrics are recorded by the worker that delivers it
+                    await broker.forward(
+                        sender=agent_name,
+                        target=target_agent,
+                        payload=payload,
+                        message_id=message_id,
+                        conn=id(websocket),
+                        received_at=received_at,
+                        new_request=new_request,
+                    )
+                    logger.debug("Message forwarded: %s → %s (worker %s)",
+                                 agent_name, target_agent, broker.remote_agents.get(target_agent))
+                elif message_id is not None:
+                    metrics.message_queued(target_agent)
+                    logger.info("Agent '%s' is offline, message %s queued", target_agent, message_id)
+                else:
+                    metrics.route_failed(agent_name, "target_not_found", new_request)
+                    logger.warning("Target agent '%s' not found", target_agent)
+                    await websocket.send(f"Error: Agent '{target_agent}' not available")
             else:
-                print(f"[Server] Warning: Unknown message format: {message[:50]}...")
+                logger.warning("Unknown message format: %s...", message[:50])
 
     except websockets.exceptions.ConnectionClosed:
-        print(f"[Server] Connection closed for agent: {agent_name}")
+        logger.info("Connection closed for agent: %s", agent_name)
     finally:
-        if agent_name and agent_name in agents:
+        connections.pop(id(websocket), None)
+        if agent_name and agents.get(agent_name) is websocket:
             del agents[agent_name]
-            print(f"[Server] Agent '{agent_name}' unregistered")
+            metrics.agent_disconnected(agent_name)
+            if store:
+                # A clean close means the agent is done; otherwise replay what it had
+                if websocket.close_code in (1000, 1001):
+                    store.ack_all(agent_name)
+                else:
+                    store.forget(agent_name)
+            if broker:
+                await broker.unregister(agent_name)
+            logger.info("Agent '%s' unregistered", agent_name)
+
+async def deliver_forwarded(message):
+    """Deliver a message another worker forwarded to one of our agents."""
+    if message["target"] not in agents:
+        await broker.reject(message)
+        return
+    await deliver(message["target"], message["sender"], message["payload"],
+                  message["message_id"], message["received_at"])
+    logger.debug("Message routed: %s → %s (from worker %s)", message["sender"], message["target"], message["origin"])
+
+async def reject_forwarded(message):
+    """The target of a forwarded message is gone: tell the original sender."""
+    if message["message_id"] is not None:
+        metrics.message_queued(message["target"])
+        logger.info("Agent '%s' is offline, message %s queued", message["target"], message["message_id"])
+        return
+    metrics.route_failed(message["sender"], "target_not_found", message["new_request"])
+    logger.warning("Target agent '%s' not found", message["target"])
+    websocket = connections.get(message["conn"])
+    if websocket:
+        await websocket.send(f"Error: Agent '{message['target']}' not available")
+
+async def process_request(connection, request):
+    # Plain HTTP GET /metrics returns a JSON snapshot; everything else is a websocket
+    if request.path == "/metrics":
+        if broker:
+            # Metrics are per process, so merge every worker's
+            try:
+                states = await broker.gather_metrics()
+            except asyncio.TimeoutError:
+                logger.warning("Timed out gathering worker metrics, reporting this worker only")
+                states = [metrics.state()]
+            snapshot = render(merge_states(states))
+            snapshot["workers"] = len(states)
+        else:
+            snapshot = metrics.snapshot()
+        if store:
+            snapshot["pending_messages"] = store.pending_counts()
+        response = connection.respond(HTTPStatus.OK, json.dumps(snapshot, indent=2) + "\n")
+        response.headers["Content-Type"] = "application/json"
+        return response
+    return None
+
+async def compact_periodically():
+    while True:
+        deleted = store.compact()
+        if deleted:
+            logger.info("Message log compacted: %d message(s) removed", deleted)
+        await asyncio.sleep(COMPACT_INTERVAL)
+
+async def serve(worker_id=None):
+    global broker, store
+    if MESSAGE_LOG:
+        store = MessageStore(MESSAGE_LOG)
+        asyncio.create_task(compact_periodically())
+    if worker_id is not None:
+        broker = BrokerClient(worker_id, deliver_forwarded, reject_forwarded, metrics.state)
+        await broker.connect(BROKER_SOCKET)
 
-async def main():
     server = await websockets.serve(
         handle_connection,
-        "localhost",
-        8765,
+        HOST,
+        PORT,
         ping_interval=20,
-        ping_timeout=60
+        ping_timeout=60,
+        process_request=process_request,
+        reuse_port=worker_id is not None,
     )
-    print("[Server] A2A Server running on ws://localhost:8765")
+    if worker_id is None:
+        logger.info("A2A Server running on ws://%s:%s (metrics: http://%s:%s/metrics)", HOST, PORT, HOST, PORT)
+    else:
+        # Workers stop together with the parent process that runs the broker
+        await broker.listener
+        server.close()
     await server.wait_closed()
 
+def run_worker(worker_id):
+    try:
+        asyncio.run(serve(worker_id))
+    except KeyboardInterrupt:
+        pass
+
+async def main():
+    if WORKERS <= 1:
+        await serve()
+        return
+
+    broker_server = await Broker().serve(BROKER_SOCKET)
+    # spawn: workers must not inherit the parent's running event loop
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=run_worker, args=(i,), name=f"worker-{i}", daemon=True)
+        for i in range(WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    logger.info("A2A Server running on ws://%s:%s with %d workers", HOST, PORT, WORKERS)
+    stopping = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopping.set)
+    try:
+        await stopping.wait()
+        logger.info("Shutting down...")
+    finally:
+        # Stop workers first so the broker sees their connections close cleanly
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            await asyncio.to_thread(worker.join)
+        broker_server.close()
+
 if __name__ == "__main__":
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
-        print("\n[Server] Shutting down...")
\ No newline at end of file
+        logger.info("Shutting down...")
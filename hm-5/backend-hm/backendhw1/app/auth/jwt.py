@@ -1,25 +1,33 @@
 from datetime import datetime,timedelta
+from functools import lru_cache
 
-from jose import JWTError,jwt 
+from app.config import get_settings
 
-from dotenv import load_dotenv
-import os 
 
-load_dotenv()
+@lru_cache
+def _jose():
+    # python-jose pulls in its crypto backends, so it is imported on first use (or at startup)
+    from jose import JWTError, jwt
+    return jwt, JWTError
+
+
+def warm_up():
+    _jose()
 
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
 def create_access_token(data:dict):
+    jwt, _ = _jose()
+    settings = get_settings()
     to_encode=data.copy()
-    expire=datetime.utcnow()+timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    expire=datetime.utcnow()+timedelta(minutes=settings.access_token_expire_minutes)
     to_encode.update({"exp":expire})
-    return jwt.encode(to_encode,SECRET_KEY,algorithm=ALGORITHM)
+    return jwt.encode(to_encode,settings.secret_key,algorithm=settings.algorithm)
 
 
 def decode_access_token(token:str):
+    jwt, JWTError = _jose()
+    settings = get_settings()
     try:
-        return jwt.encode(token,SECRET_KEY,algorithm=[ALGORITHM])
+        return jwt.decode(token,settings.secret_key,algorithms=[settings.algorithm])
     except JWTError:
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,31 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+from dotenv import load_dotenv
+import os
+
+
+@dataclass(frozen=True)
+class Settings:
+    database_url: Optional[str]
+    secret_key: Optional[str]
+    algorithm: str
+    access_token_expire_minutes: int
+    # Connections opened at startup so the first requests don't pay for them
+    db_pool_warmup: int
+    # Seconds to wait for a database connection, so an unreachable host can't hang startup
+    db_connect_timeout: int
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Read .env once and return the settings (cached for the process)."""
+    load_dotenv()
+    return Settings(
+        database_url=os.getenv("DATABASE_URL") or None,
+        secret_key=os.getenv("SECRET_KEY"),
+        algorithm=os.getenv("ALGORITHM", "HS256"),
+        access_token_expire_minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30)),
+        db_pool_warmup=int(os.getenv("DB_POOL_WARMUP", 2)),
+        db_connect_timeout=int(os.getenv("DB_CONNECT_TIMEOUT", 5)),
+    )
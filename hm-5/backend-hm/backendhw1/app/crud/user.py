@@ -1,15 +1,23 @@
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.schemas.user import UserCreate
-from passlib.context import CryptContext
+from functools import lru_cache
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@lru_cache
+def get_pwd_context():
+    """bcrypt context, built on first use (or at startup) instead of at import."""
+    from passlib.context import CryptContext
+    context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    # Load the bcrypt backend now rather than on the first login
+    context.handler().get_backend()
+    return context
 
 def get_user_by_username(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
 def create_user(db: Session, user: UserCreate):
-    hashed_pw = pwd_context.hash(user.password)
+    hashed_pw = get_pwd_context().hash(user.password)
     db_user = User(username=user.username, hashed_password=hashed_pw)
     db.add(db_user)
     db.commit()
@@ -17,4 +25,4 @@ def create_user(db: Session, user: UserCreate):
     return db_user
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
@@ -1,14 +1,58 @@
-from sqlalchemy import create_engine
+from contextlib import ExitStack
+from typing import Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
-import os
+from app.config import get_settings
 
-load_dotenv()
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
 
-DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def get_engine() -> Engine:
+    """Create the engine on first use, so importing the app needs no database."""
+    global _engine, _session_factory
+    if _engine is None:
+        settings = get_settings()
+        database_url = settings.database_url
+        if not database_url:
+            raise RuntimeError("DATABASE_URL is not set")
+        # libpq's connect_timeout; other drivers (e.g. sqlite) don't accept it
+        connect_args = {}
+        if make_url(database_url).get_backend_name() == "postgresql":
+            connect_args["connect_timeout"] = settings.db_connect_timeout
+        # pre_ping replaces connections the database closed while idle
+        _engine = create_engine(database_url, pool_pre_ping=True, connect_args=connect_args)
+        _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+    return _engine
+
+
+def SessionLocal():
+    get_engine()
+    return _session_factory()
+
+
+def warm_up_pool(connections: int) -> int:
+    """Open connections at once so they stay in the pool. Returns how many were opened."""
+    engine = get_engine()
+    # Pools without a fixed size (e.g. NullPool) keep nothing, one check is enough
+    pool_size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+    opened = 0
+    with ExitStack() as stack:
+        for _ in range(min(connections, pool_size)):
+            stack.enter_context(engine.connect()).execute(text("SELECT 1"))
+            opened += 1
+    return opened
+
+
+def dispose_engine():
+    global _engine, _session_factory
+    if _engine is not None:
+        _engine.dispose()
+    _engine = None
+    _session_factory = None
+
 
 def get_db():
     db = SessionLocal()
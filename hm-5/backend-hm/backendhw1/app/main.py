@@ -1,23 +1,66 @@
+import asyncio
+from contextlib import asynccontextmanager
+import logging
+import os
+import time
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.api.endpoints import task, auth
+from app.auth import jwt
+from app.config import get_settings
+from app.crud.user import get_pwd_context
+from app.db.session import dispose_engine, warm_up_pool
 
-app = FastAPI()
+STATIC_DIR = "app/static"
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+logger = logging.getLogger("uvicorn.error")
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the heavy pieces once the server starts instead of at import time."""
+    started = time.perf_counter()
+    settings = get_settings()
+    get_pwd_context()
+    jwt.warm_up()
+    if not settings.database_url:
+        logger.warning("DATABASE_URL is not set, database endpoints will fail")
+    else:
+        try:
+            # psycopg2 connects block, so keep them off the event loop and bounded
+            opened = await asyncio.wait_for(
+                asyncio.to_thread(warm_up_pool, settings.db_pool_warmup), settings.db_connect_timeout
+            )
+            logger.info("Database pool warmed up with %d connections", opened)
+        except asyncio.TimeoutError:
+            logger.warning("Database pool warm-up timed out after %d s", settings.db_connect_timeout)
+        except Exception as e:
+            # The database may still be starting (docker-compose); requests will retry
+            logger.warning("Database pool warm-up failed: %s", e)
+    logger.info("Startup finished in %.0f ms", (time.perf_counter() - started) * 1000)
+    yield
+    dispose_engine()
 
 
-app.include_router(task.router, prefix="/tasks", tags=["Tasks"])
-app.include_router(auth.router, prefix="/auth", tags=["Auth"])
+def create_app() -> FastAPI:
+    app = FastAPI(lifespan=lifespan)
 
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
-app.mount("/", StaticFiles(directory="app/static", html=True), name="static")
\ No newline at end of file
+    app.include_router(task.router, prefix="/tasks", tags=["Tasks"])
+    app.include_router(auth.router, prefix="/auth", tags=["Auth"])
+
+    # The frontend build only exists in the Docker image
+    if os.path.isdir(STATIC_DIR):
+        app.mount("/", StaticFiles(directory=STATIC_DIR, html=True), name="static")
+    return app
+
+
+app = create_app()
@@ -0,0 +1,111 @@
+"""Import-time profile of the app, to track cold-start latency per release.
+
+Imports the app in fresh interpreters with `python -X importtime` and reports
+the import time plus the slowest packages and modules.
+
+Usage:
+    python -m app.startup_profile [--runs 5] [--top 10] [--label v1.2] [--json profile.json]
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "import time: self [us] | cumulative | imported package"
+LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def profile_once(target: str) -> Dict:
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=PROJECT_DIR, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{result.stderr[-2000:]}")
+
+    modules, import_us = {}, 0
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules[name] = int(self_us)
+        if name == target and len(indent) == 1:
+            import_us = int(cumulative_us)
+    return {"wall_ms": wall * 1000, "import_ms": import_us / 1000, "modules": modules}
+
+
+def by_package(modules: Dict[str, int]) -> Dict[str, float]:
+    packages = defaultdict(float)
+    for name, self_us in modules.items():
+        packages[name.split(".")[0]] += self_us / 1000
+    return packages
+
+
+def top(times: Dict[str, float], n: int) -> Dict[str, float]:
+    return {name: round(ms, 1) for name, ms in sorted(times.items(), key=lambda item: -item[1])[:n]}
+
+
+def build_report(target: str, runs: List[Dict], n: int, label: str) -> Dict:
+    # The breakdown comes from the run with the median import time
+    median_run = sorted(runs, key=lambda run: run["import_ms"])[len(runs) // 2]
+    modules_ms = {name: us / 1000 for name, us in median_run["modules"].items()}
+    return {
+        "label": label,
+        "target": target,
+        "python": platform.python_version(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "runs": len(runs),
+        "import_ms": {
+            "median": round(statistics.median(run["import_ms"] for run in runs), 1),
+            "min": round(min(run["import_ms"] for run in runs), 1),
+        },
+        "wall_ms": {"median": round(statistics.median(run["wall_ms"] for run in runs), 1)},
+        "modules_imported": len(median_run["modules"]),
+        "packages": top(by_package(median_run["modules"]), n),
+        "modules": top(modules_ms, n),
+    }
+
+
+def print_report(report: Dict):
+    print(f"Import profile of {report['target']} ({report['runs']} runs, Python {report['python']})")
+    print(f"  import:      median {report['import_ms']['median']:.0f} ms, min {report['import_ms']['min']:.0f} ms")
+    print(f"  interpreter: median {report['wall_ms']['median']:.0f} ms including startup")
+    print(f"  modules:     {report['modules_imported']}")
+    for title, key in [("Slowest packages (self time)", "packages"), ("Slowest modules (self time)", "modules")]:
+        print(f"\n{title}:")
+        for name, ms in report[key].items():
+            print(f"  {name:<45} {ms:>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the app's import time")
+    parser.add_argument("--target", default="app.main", help="module to import")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to average over")
+    parser.add_argument("--top", type=int, default=10, help="packages/modules to list")
+    parser.add_argument("--label", default=os.getenv("RELEASE", ""), help="release label stored in the report")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    runs = [profile_once(args.target) for _ in range(args.runs)]
+    report = build_report(args.target, runs, args.top, args.label)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
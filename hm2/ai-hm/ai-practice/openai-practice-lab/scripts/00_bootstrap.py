@@ -1,19 +1,110 @@
 import os
 import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from openai import OpenAI
+from answer_cache import AnswerCache
+from llm_client import get_client
 
 load_dotenv()
 
-def main():
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    assistant_file = "assistant_info.json"
-    if os.path.exists(assistant_file):
-        with open(assistant_file, 'r') as f:
-            assistant_info = json.load(f)
-        print(f"Using existing assistant: {assistant_info['id']}")
-        return assistant_info
+DATA_DIR = "data"
+# Content hash -> uploaded file id, so unchanged files are never uploaded twice
+MANIFEST_FILE = "upload_manifest.json"
+SUPPORTED_EXTENSIONS = {".pdf", ".txt", ".md", ".docx", ".pptx", ".html", ".json"}
+UPLOAD_WORKERS = 4
+
+def vector_stores_api(client):
+    # Newer SDKs moved vector stores out of beta
+    return client.vector_stores if hasattr(client, "vector_stores") else client.beta.vector_stores
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def scan_data_dir(data_dir=DATA_DIR):
+    """All supported files under data_dir: {sha256: {"path": ..., "bytes": ...}}"""
+    found = {}
+    for root, _, names in os.walk(data_dir):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                # Identical copies under different names are uploaded once
+                found.setdefault(file_sha256(path), {"path": path, "bytes": os.path.getsize(path)})
+    return found
+
+def load_manifest(assistant_info):
+    if os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE, 'r') as f:
+            return json.load(f)
+    manifest = {"vector_store_id": None, "files": {}}
+    # assistant_info.json from before the manifest existed: the PDF was already uploaded
+    legacy_pdf = os.path.join(DATA_DIR, "mathbook.pdf")
+    if assistant_info and assistant_info.get("file_id") and os.path.exists(legacy_pdf):
+        manifest["vector_store_id"] = assistant_info.get("vector_store_id")
+        manifest["files"][file_sha256(legacy_pdf)] = {
+            "file_id": assistant_info["file_id"],
+            "path": legacy_pdf,
+            "bytes": os.path.getsize(legacy_pdf),
+            "upload_seconds": 0.0,
+        }
+    return manifest
 
+def save_manifest(manifest):
+    with open(MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+def upload_file(client, path):
+    started = time.perf_counter()
+    with open(path, "rb") as file_obj:
+        uploaded_file = client.files.create(file=file_obj, purpose="assistants")
+    return uploaded_file.id, time.perf_counter() - started
+
+def upload_new_files(client, pending):
+    """Upload {sha256: {"path", "bytes"}} concurrently. Returns manifest entries for the successful ones."""
+    entries = {}
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+        futures = {pool.submit(upload_file, client, info["path"]): sha for sha, info in pending.items()}
+        for future in as_completed(futures):
+            sha = futures[future]
+            info = pending[sha]
+            try:
+                file_id, seconds = future.result()
+            except Exception as e:
+                print(f"⚠️ Failed to upload {info['path']}: {e}")
+                continue
+            entries[sha] = {"file_id": file_id, "path": info["path"],
+                            "bytes": info["bytes"], "upload_seconds": round(seconds, 3)}
+            print(f"   ⬆️ {info['path']} ({info['bytes'] / 1024:.0f} KB, {seconds:.1f}s)")
+    return entries
+
+def remove_stale_files(client, vector_store_id, stale):
+    """Detach and delete uploads whose content is no longer in data/ (changed or removed files).
+
+    vector_store_id is None when the files were never attached to the current store.
+    """
+    for entry in stale:
+        if vector_store_id:
+            try:
+                vector_stores_api(client).files.delete(vector_store_id=vector_store_id, file_id=entry["file_id"])
+            except Exception as e:
+                print(f"⚠️ Could not detach {entry['file_id']}: {e}")
+        try:
+            client.files.delete(entry["file_id"])
+        except Exception as e:
+            print(f"⚠️ Could not delete {entry['file_id']}: {e}")
+        print(f"   🗑️ Removed old upload of {entry['path']}")
+
+def processed_file_ids(client, vector_store_id, batch):
+    """Ids of the batch's files the vector store finished processing."""
+    files = vector_stores_api(client).file_batches.list_files(vector_store_id=vector_store_id, batch_id=batch.id)
+    return {vector_store_file.id for vector_store_file in files if vector_store_file.status == "completed"}
+
+def create_assistant(client):
     print("Creating new Transformer Tutor Assistant...")
     assistant = client.beta.assistants.create(
         name="Transformer Tutor Assistant",
@@ -25,45 +116,101 @@ def main():
         model="gpt-4o-mini",
         tools=[{"type": "file_search"}]
     )
+    vector_store = vector_stores_api(client).create(name="TransformerPaperStore")
+    client.beta.assistants.update(
+        assistant.id,
+        tool_resources={"file_search": {"vector_store_ids": [vector_store.id]}}
+    )
+    print(f"Assistant created successfully: {assistant.id}")
+    return {"id": assistant.id, "name": assistant.name, "vector_store_id": vector_store.id}
 
-    file_path = "data/mathbook.pdf"
-    if os.path.exists(file_path):
-        with open(file_path, "rb") as file_obj:
-            uploaded_file = client.files.create(
-                file=file_obj,
-                purpose="assistants"
-            )
-        try:
-            vector_store = client.vector_stores.create(name="TransformerPaperStore")
-            client.vector_stores.files.create(
-                vector_store_id=vector_store.id,
-                file_id=uploaded_file.id
-            )
-        except AttributeError:
-            vector_store = client.beta.vector_stores.create(name="TransformerPaperStore")
-            client.beta.vector_stores.files.create(
-                vector_store_id=vector_store.id,
-                file_id=uploaded_file.id
-            )
-
-        client.beta.assistants.update(
-            assistant.id,
-            tool_resources={"file_search": {"vector_store_ids": [vector_store.id]}}
-        )
-        assistant_info = {
-            "id": assistant.id,
-            "name": assistant.name,
-            "vector_store_id": vector_store.id,
-            "file_id": uploaded_file.id
-        }
-        with open(assistant_file, 'w') as f:
-            json.dump(assistant_info, f, indent=2)
-        print(f"Assistant created successfully: {assistant.id}")
-        print(f"Assistant info saved to {assistant_file}")
-        return assistant_info
-    else:
-        print(f"Study material not found at {file_path}")
+def main():
+    client = get_client()
+    assistant_file = "assistant_info.json"
+
+    current = scan_data_dir()
+    if not current:
+        print(f"Study material not found in {DATA_DIR}/")
         return None
 
+    assistant_info = None
+    if os.path.exists(assistant_file):
+        with open(assistant_file, 'r') as f:
+            assistant_info = json.load(f)
+        print(f"Using existing assistant: {assistant_info['id']}")
+    manifest = load_manifest(assistant_info)
+    if assistant_info is None:
+        assistant_info = create_assistant(client)
+    vector_store_id = assistant_info["vector_store_id"]
+
+    known = manifest["files"]
+    pending = {sha: info for sha, info in current.items() if sha not in known}
+    stale = {sha: entry for sha, entry in known.items() if sha not in current}
+    skipped = [entry for sha, entry in known.items() if sha in current]
+
+    started = time.perf_counter()
+    if pending:
+        print(f"Uploading {len(pending)} new or changed files with {UPLOAD_WORKERS} workers...")
+    uploaded = upload_new_files(client, pending)
+    upload_time = time.perf_counter() - started
+
+    # A new vector store (e.g. assistant_info.json was removed) needs every file attached again
+    if manifest["vector_store_id"] != vector_store_id:
+        to_attach = [known[sha]["file_id"] for sha in known if sha in current]
+    else:
+        to_attach = []
+    to_attach += [entry["file_id"] for entry in uploaded.values()]
+
+    if to_attach:
+        batch = vector_stores_api(client).file_batches.create_and_poll(
+            vector_store_id=vector_store_id,
+            file_ids=to_attach
+        )
+        counts = batch.file_counts
+        print(f"Attached {counts.completed}/{len(to_attach)} files to {vector_store_id} "
+              f"in one batch ({batch.status})")
+        if counts.completed < len(to_attach):
+            # Forget failed (or cancelled) files, so the next run uploads and attaches them again
+            processed = processed_file_ids(client, vector_store_id, batch)
+            failed = {sha: entry for sha, entry in {**known, **uploaded}.items()
+                      if entry["file_id"] in to_attach and entry["file_id"] not in processed}
+            print(f"⚠️ {len(failed)} files failed to process, they will be retried on the next run")
+            remove_stale_files(client, vector_store_id, failed.values())
+            for sha in failed:
+                known.pop(sha, None)
+                uploaded.pop(sha, None)
+    if stale:
+        same_store = manifest["vector_store_id"] == vector_store_id
+        remove_stale_files(client, vector_store_id if same_store else None, stale.values())
+
+    for sha in stale:
+        del known[sha]
+    known.update(uploaded)
+    manifest["vector_store_id"] = vector_store_id
+    save_manifest(manifest)
+
+    assistant_info["file_ids"] = [known[sha]["file_id"] for sha in current if sha in known]
+    # Kept for scripts that expect a single file
+    assistant_info["file_id"] = assistant_info["file_ids"][0] if assistant_info["file_ids"] else None
+    with open(assistant_file, 'w') as f:
+        json.dump(assistant_info, f, indent=2)
+
+    skipped_bytes = sum(entry["bytes"] for entry in skipped)
+    saved = sum(entry.get("upload_seconds", 0.0) for entry in skipped)
+    uploaded_bytes = sum(entry["bytes"] for entry in uploaded.values())
+    print(f"📦 Uploaded {len(uploaded)} files ({uploaded_bytes / 1024 / 1024:.1f} MB) in {upload_time:.1f}s")
+    print(f"⏭️ Skipped {len(skipped)} unchanged files ({skipped_bytes / 1024 / 1024:.1f} MB), "
+          f"saved ~{saved:.1f}s of uploads")
+
+    if uploaded or stale:
+        # Answers from the old material are no longer valid
+        cache = AnswerCache()
+        removed = cache.clear()
+        cache.close()
+        if removed:
+            print(f"Cleared {removed} cached answers")
+    print(f"Assistant info saved to {assistant_file}")
+    return assistant_info
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,16 +1,25 @@
 import os
 import json
 import time
+import argparse
 from dotenv import load_dotenv
 from openai import OpenAI
 from typing import Tuple, Optional, Dict, Any, List
+from assistant_runs import RunTimings, execute_run
+from answer_cache import AnswerCache
+from llm_client import get_client
 
 # Load environment variables
 load_dotenv()
 
-def create_thread_and_run(client: OpenAI, assistant_id: str, user_message: str) -> Tuple[Any, Any]:
-    """Create a new thread and run with the user's message."""
-    thread = client.beta.threads.create()
+def create_thread_and_run(client: OpenAI, assistant_id: str, user_message: str,
+                          thread: Optional[Any] = None) -> Tuple[Any, Any, RunTimings]:
+    """Add the user's message to a thread (a new one unless given) and run the assistant on it.
+
+    The answer is printed as it streams in. Returns the thread, the finished run and its timings.
+    """
+    if thread is None:
+        thread = client.beta.threads.create()
     
     client.beta.threads.messages.create(
         thread_id=thread.id,
@@ -18,31 +27,14 @@ def create_thread_and_run(client: OpenAI, assistant_id: str, user_message: str)
         content=user_message
     )
     
-    run = client.beta.threads.runs.create(
-        thread_id=thread.id,
-        assistant_id=assistant_id
+    print("\n📚 Answer:")
+    run, timings = execute_run(
+        client, thread.id, assistant_id,
+        on_text=lambda text: print(text, end="", flush=True)
     )
+    print()
     
-    return thread, run
-
-def wait_for_run_completion(client: OpenAI, thread_id: str, run_id: str) -> Any:
-    """Wait for the run to complete and return the final status."""
-    while True:
-        run = client.beta.threads.runs.retrieve(
-            thread_id=thread_id,
-            run_id=run_id
-        )
-        
-        if run.status == "completed":
-            return run
-        elif run.status in ["failed", "cancelling", "cancelled", "expired"]:
-            print(f"Run ended with status: {run.status}")
-            if run.status == "failed" and hasattr(run, 'last_error'):
-                print(f"Error details: {run.last_error}")
-            return run
-        
-        print(f"Current status: {run.status}... waiting")
-        time.sleep(2)
+    return thread, run, timings
 
 def get_response_and_citations(client: OpenAI, thread_id: str) -> Tuple[Optional[str], List[Dict]]:
     """Retrieve the assistant's response and any citations from the thread."""
@@ -67,6 +59,51 @@ def get_response_and_citations(client: OpenAI, thread_id: str) -> Tuple[Optional
     
     return None, []
 
+LOCAL_SYSTEM_PROMPT = (
+    "You are a knowledgeable tutor for the study PDF. "
+    "Answer concisely using only the passages below. "
+    "Always cite page numbers like (p. 3). If the passages do not contain the answer, say so."
+)
+
+def answer_locally(client: OpenAI, index: Any, question: str, max_chars: int) -> Tuple[Optional[str], List[Dict]]:
+    """Answer from the local offline index: top passages + a small chat completion."""
+    from local_index import build_context
+    
+    started = time.perf_counter()
+    passages = index.search(question)
+    retrieval_ms = (time.perf_counter() - started) * 1000
+    if not passages:
+        print(f"\n📚 Answer:\nNo matching passages in the study material ({retrieval_ms:.1f} ms)")
+        return None, []
+    
+    print("\n📚 Answer:")
+    stream = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": f"{LOCAL_SYSTEM_PROMPT}\n\n{build_context(passages, max_chars)}"},
+            {"role": "user", "content": question}
+        ],
+        stream=True
+    )
+    parts = []
+    first_token = None
+    for chunk in stream:
+        text = chunk.choices[0].delta.content if chunk.choices else None
+        if text:
+            if first_token is None:
+                first_token = time.perf_counter() - started
+            parts.append(text)
+            print(text, end="", flush=True)
+    print()
+    first = f"{first_token:.2f}s" if first_token is not None else "n/a"
+    print(f"⏱️ Retrieval: {retrieval_ms:.1f} ms, first token: {first}, total: {time.perf_counter() - started:.2f}s (local index)")
+    
+    citations = [
+        {"type": "page_citation", "text": f"Page {passage.page}", "score": round(passage.score, 3)}
+        for passage in passages
+    ]
+    return "".join(parts), citations
+
 def load_assistant_info(file_path: str = "assistant_info.json") -> Dict[str, Any]:
     """Load assistant information from JSON file."""
     if not os.path.exists(file_path):
@@ -85,13 +122,57 @@ def display_welcome_message():
     print("Type 'quit', 'exit', or 'bye' to exit.")
     print(border)
 
+def add_to_thread(client: OpenAI, thread_id: str, question: str, answer: str):
+    """Record a cached exchange in the session thread so later turns see it."""
+    client.beta.threads.messages.create(thread_id=thread_id, role="user", content=question)
+    client.beta.threads.messages.create(thread_id=thread_id, role="assistant", content=answer)
+
+def print_citations(citations: List[Dict]):
+    if citations:
+        print(f"\n📎 Citations ({len(citations)}):")
+        for i, citation in enumerate(citations, 1):
+            print(f"  {i}. Type: {citation.get('type')}")
+            print(f"     Text: {citation.get('text')}")
+            if 'file_citation' in citation:
+                print(f"     File citation: {citation['file_citation']}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ask questions about the study PDF")
+    parser.add_argument("--session", action="store_true",
+                        help="keep one thread for the whole conversation (follow-up questions keep context)")
+    parser.add_argument("--no-cache", action="store_true", help="always ask the assistant, skip the local answer cache")
+    parser.add_argument("--local", action="store_true",
+                        help="retrieve passages from the offline index (scripts/local_index.py build) instead of the vector store")
+    parser.add_argument("--context-chars", type=int, default=3000,
+                        help="max characters of retrieved passages sent with --local")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     try:
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = get_client()
+        
+        local_index = None
+        if args.local:
+            from local_index import LocalIndex
+            local_index = LocalIndex()
+            # Cache answers per indexed file instead of per assistant/vector store
+            assistant_id, vector_store_id = "local", local_index.index_id
+            print(f"Using local index: {local_index.meta['source']} ({local_index.meta['chunks']} chunks)")
+            if args.session:
+                print("⚠️ --session has no effect with --local")
+        else:
+            assistant_info = load_assistant_info()
+            assistant_id = assistant_info["id"]
+            vector_store_id = assistant_info.get("vector_store_id")
+            print(f"Using assistant: {assistant_id}")
         
-        assistant_info = load_assistant_info()
-        assistant_id = assistant_info["id"]
-        print(f"Using assistant: {assistant_id}")
+        cache = None if args.no_cache else AnswerCache()
+        # In session mode every question goes to the same thread
+        session_thread = client.beta.threads.create() if args.session and not local_index else None
+        if session_thread:
+            print(f"Session thread: {session_thread.id}")
+        answered = 0
         
         display_welcome_message()
         
@@ -107,20 +188,40 @@ def main():
                     print("⚠️ Please enter a question.")
                     continue
                 
-                thread, run = create_thread_and_run(client, assistant_id, user_question)
-                completed_run = wait_for_run_completion(client, thread.id, run.id)
+                # Session follow-ups ("why?") depend on earlier turns, so only the first question is cached
+                use_cache = cache is not None and not (session_thread and answered)
+                cached = cache.get(assistant_id, vector_store_id, user_question) if use_cache else None
+                if cached:
+                    response, citations = cached
+                    print(f"\n📚 Answer (⚡ cached):\n{response}")
+                    print_citations(citations)
+                    if session_thread:
+                        add_to_thread(client, session_thread.id, user_question, response)
+                    answered += 1
+                    continue
+                
+                if local_index:
+                    response, citations = answer_locally(client, local_index, user_question, args.context_chars)
+                    print_citations(citations)
+                    if use_cache and response:
+                        cache.put(assistant_id, vector_store_id, user_question, response, citations)
+                    continue
+                
+                thread, completed_run, timings = create_thread_and_run(
+                    client, assistant_id, user_question, thread=session_thread
+                )
+                # The question is in the session thread now, whatever the outcome
+                answered += 1
                 
                 if completed_run.status == "completed":
                     response, citations = get_response_and_citations(client, thread.id)
-                    print(f"\n📚 Answer:\n{response}")
+                    if not timings.streamed:
+                        print(response)
+                    print(timings.summary())
+                    print_citations(citations)
                     
-                    if citations:
-                        print(f"\n📎 Citations ({len(citations)}):")
-                        for i, citation in enumerate(citations, 1):
-                            print(f"  {i}. Type: {citation.get('type')}")
-                            print(f"     Text: {citation.get('text')}")
-                            if 'file_citation' in citation:
-                                print(f"     File citation: {citation['file_citation']}")
+                    if use_cache and response:
+                        cache.put(assistant_id, vector_store_id, user_question, response, citations)
                 else:
                     print(f"❌ Failed to get response: {completed_run.status}")
                     
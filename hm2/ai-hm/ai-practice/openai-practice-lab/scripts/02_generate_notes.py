@@ -1,11 +1,17 @@
 import os
+import re
 import json
 import time
+import queue
+import argparse
+import threading
 import warnings
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any, Tuple
 from dotenv import load_dotenv
 from openai import OpenAI
 from pydantic import BaseModel, Field, ValidationError, validator
+from assistant_runs import cancel_run, execute_run
+from llm_client import get_client
 
 # Suppress specific warnings
 warnings.filterwarnings("ignore", message=".*Assistants API is deprecated.*")
@@ -13,6 +19,9 @@ warnings.filterwarnings("ignore", message=".*Assistants API is deprecated.*")
 # Load environment variables
 load_dotenv()
 
+# How long a losing assistant thread gets to wind down before the script exits
+CANCEL_GRACE_SECONDS = 5.0
+
 class Note(BaseModel):
     """Represents a single study note with validation."""
     id: int = Field(..., ge=1, le=10, description="Unique note ID from 1-10")
@@ -32,6 +41,136 @@ class NotesCollection(BaseModel):
     notes: List[Note] = Field(..., min_items=10, max_items=10, 
                              description="Exactly 10 study notes")
 
+class NoteStreamParser:
+    """Incremental parser for streamed notes JSON.
+
+    Prose and ```json fences before the JSON and anything after it are skipped,
+    so a response is scanned exactly once. A bracketed aside in the prose
+    ("the notes [JSON]:") closes without notes and scanning restarts at the
+    next { or [; a fence always restarts it. Items of the "notes" array (or of
+    a bare top-level array) are parsed and validated as Notes as soon as they
+    close.
+    """
+
+    def __init__(self, on_note: Optional[Callable[[Note], None]] = None):
+        self.on_note = on_note
+        self.notes: List[Note] = []
+        self.errors: List[str] = []
+        self.received = False
+        self._done = False
+        self._backticks = 0
+        self._reset()
+
+    def _reset(self):
+        """Forget the current candidate value and look for the next one."""
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        # Last string read directly in the top-level object, i.e. the current key
+        self._key: Optional[List[str]] = None
+        self._last_key: Optional[str] = None
+        # Stack depth inside the notes array, where note objects start
+        self._items_depth: Optional[int] = None
+        # Characters of the note object being read
+        self._note: Optional[List[str]] = None
+
+    @property
+    def failed(self) -> bool:
+        return bool(self.errors)
+
+    def feed(self, chunk: str) -> List[Note]:
+        """Consume the next piece of text. Returns the notes completed by it."""
+        self.received = True
+        completed = []
+        for ch in chunk:
+            if self._done:
+                break
+            if self._note is not None:
+                self._note.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key is not None:
+                        self._last_key = "".join(self._key)
+                        self._key = None
+                elif self._key is not None:
+                    self._key.append(ch)
+                continue
+
+            self._backticks = self._backticks + 1 if ch == "`" else 0
+            if self._backticks == 3:
+                # A fence is never part of the JSON: start over after it
+                if self.notes or self.errors:
+                    self._done = True
+                else:
+                    self._reset()
+            elif ch == '"':
+                # Quotes in text around the JSON are not strings
+                self._in_string = bool(self._stack)
+                self._key = [] if self._stack == ["{"] else None
+            elif ch in "{[":
+                if ch == "{" and self._note is None and len(self._stack) == self._items_depth:
+                    self._note = [ch]
+                elif ch == "[" and (not self._stack or (self._stack == ["{"] and self._last_key == "notes")):
+                    self._items_depth = len(self._stack) + 1
+                self._stack.append(ch)
+            elif ch in "}]" and self._stack:
+                self._stack.pop()
+                if self._note is not None and len(self._stack) == self._items_depth:
+                    note = self._add_note("".join(self._note))
+                    self._note = None
+                    if note:
+                        completed.append(note)
+                if not self._stack:
+                    # A candidate that held no notes was prose, keep looking
+                    if self.notes or self.errors:
+                        self._done = True
+                    else:
+                        self._reset()
+        return completed
+
+    def _add_note(self, text: str) -> Optional[Note]:
+        position = len(self.notes) + len(self.errors) + 1
+        try:
+            try:
+                data = json.loads(text)
+            except json.JSONDecodeError:
+                # Trailing commas are the most common slip in generated JSON
+                data = json.loads(re.sub(r",\s*([}\]])", r"\1", text))
+            note = Note(**data)
+        except json.JSONDecodeError as e:
+            return self._reject(f"Note {position}: JSON error: {e}")
+        except ValidationError as e:
+            return self._reject(f"Note {position}: validation error: {e}")
+        if any(existing.id == note.id for existing in self.notes):
+            return self._reject(f"Note {position}: duplicate id {note.id}")
+        self.notes.append(note)
+        if self.on_note:
+            self.on_note(note)
+        return note
+
+    def _reject(self, message: str) -> None:
+        print(f"⚠️ {message}")
+        self.errors.append(message)
+        return None
+
+    def finish(self) -> Optional[List[Note]]:
+        """Validate the whole collection once the response is complete."""
+        if self.failed:
+            return None
+        if not self.notes:
+            print("No notes found in response")
+            return None
+        try:
+            return NotesCollection(notes=self.notes).notes
+        except ValidationError as e:
+            print(f"Validation error: {e}")
+            return None
+
 class NoteGenerator:
     """Handles generation and processing of study notes."""
     
@@ -46,27 +185,15 @@ class NoteGenerator:
                 return json.load(f).get('id')
         return None
     
-    def _wait_for_run_completion(self, thread_id: str, run_id: str) -> Optional[Any]:
-        """Wait for assistant run to complete."""
-        while True:
-            run = self.client.beta.threads.runs.retrieve(
-                thread_id=thread_id,
-                run_id=run_id
-            )
-            
-            if run.status == "completed":
-                return run
-            elif run.status in ["failed", "cancelling", "cancelled", "expired"]:
-                print(f"Run ended with status: {run.status}")
-                if run.status == "failed" and hasattr(run, 'last_error'):
-                    print(f"Error details: {run.last_error}")
-                return None
-            
-            print(f"Status: {run.status}... waiting")
-            time.sleep(2)
-    
-    def generate_with_assistant(self, topic: str = "Attention Is All You Need PDF") -> Optional[str]:
-        """Generate notes using the Assistants API."""
+    def generate_with_assistant(self, topic: str = "Attention Is All You Need PDF",
+                                should_stop: Optional[Callable[[], bool]] = None,
+                                on_text: Optional[Callable[[str], None]] = None,
+                                on_start: Optional[Callable[[Any], None]] = None) -> Optional[str]:
+        """Generate notes using the Assistants API.
+
+        The run is cancelled once should_stop() is True; on_start receives the run
+        as soon as it exists so it can also be cancelled from another thread.
+        """
         assistant_id = self._get_assistant_id()
         if not assistant_id:
             return None
@@ -102,12 +229,10 @@ class NoteGenerator:
                 content=prompt
             )
             
-            run = self.client.beta.threads.runs.create(
-                thread_id=thread.id,
-                assistant_id=assistant_id
-            )
-            
-            if not self._wait_for_run_completion(thread.id, run.id):
+            run, timings = execute_run(self.client, thread.id, assistant_id,
+                                       on_text=on_text, should_stop=should_stop, on_start=on_start)
+            print(timings.summary())
+            if run.status != "completed":
                 return None
                 
             messages = self.client.beta.threads.messages.list(thread_id=thread.id)
@@ -120,8 +245,9 @@ class NoteGenerator:
             
         return None
     
-    def generate_with_chat_completion(self) -> Optional[str]:
-        """Generate notes using Chat Completion API with JSON mode."""
+    def generate_with_chat_completion(self, should_stop: Optional[Callable[[], bool]] = None,
+                                      on_text: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """Generate notes using Chat Completion API with JSON mode, streamed to on_text."""
         system_prompt = """
         You are a study summarizer for "Attention Is All You Need".
         Return exactly 10 notes as valid JSON matching this schema:
@@ -154,72 +280,127 @@ class NoteGenerator:
         """
         
         try:
-            response = self.client.chat.completions.create(
+            stream = self.client.chat.completions.create(
                 model="gpt-4-turbo",
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                stream=True
             )
-            return response.choices[0].message.content
+            parts = []
+            for chunk in stream:
+                if should_stop and should_stop():
+                    stream.close()
+                    return None
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                parts.append(chunk.choices[0].delta.content)
+                if on_text:
+                    on_text(parts[-1])
+            return "".join(parts)
         except Exception as e:
             print(f"Chat completion error: {e}")
             return None
     
-    @staticmethod
-    def extract_json(content: str) -> Optional[str]:
-        """Extract JSON from potentially formatted text response."""
-        content = content.strip()
-        
-        # Check for code blocks
-        if "```json" in content:
-            start = content.find("```json") + 7
-            end = content.rfind("```")
-            if end > start:
-                return content[start:end].strip()
-                
-        elif "```" in content:
-            lines = [line for line in content.split('\n') 
-                    if not line.strip().startswith('```')]
-            return '\n'.join(lines).strip()
-            
-        # Find first { and last }
-        start_brace = content.find('{')
-        end_brace = content.rfind('}')
-        
-        if start_brace != -1 and end_brace != -1:
-            return content[start_brace:end_brace+1]
-            
-        return None
+    def generate_notes(self, hedge_after: Optional[float] = None) -> Tuple[Optional[List[Note]], Optional[str], float]:
+        """Generate and validate notes, racing the two generation paths.
+
+        hedge_after=None: chat completion only starts after the assistant fails.
+        hedge_after=0: both start at once. Otherwise chat completion also starts
+        if the assistant has not produced valid notes after that many seconds.
+        The first valid notes win. A losing assistant run is cancelled from
+        this thread, since the loser's own thread may be waiting on a tool call
+        that sends no events and dies with the script.
+        Notes are parsed while they stream, and a path stops as soon as one of
+        its notes is invalid.
+        Returns (notes, winning path, seconds taken).
+        """
+        results = queue.Queue()
+        stop = threading.Event()
+        started = time.perf_counter()
+        # Assistant run in progress, set by the assistant thread once created
+        assistant_run = {}
+        threads = {}
+        paths = {
+            "assistant": self.generate_with_assistant,
+            "chat_completion": self.generate_with_chat_completion,
+        }
+
+        def attempt(path: str):
+            notes = None
+            parser = NoteStreamParser(
+                on_note=lambda note: print(f"   📝 [{path}] Note {note.id}: {note.heading}")
+            )
+            options = {}
+            if path == "assistant":
+                options["on_start"] = lambda run: assistant_run.update(run=run)
+            try:
+                content = paths[path](should_stop=lambda: stop.is_set() or parser.failed,
+                                      on_text=parser.feed, **options)
+                if content and not stop.is_set():
+                    # Polled assistant runs deliver the text only at the end
+                    if not parser.received:
+                        parser.feed(content)
+                    notes = parser.finish()
+            except Exception as e:
+                print(f"{path} error: {e}")
+            results.put((path, notes))
+
+        def launch(path: str):
+            # Daemon threads: a losing request must not keep the script alive
+            threads[path] = threading.Thread(target=attempt, args=(path,), daemon=True)
+            threads[path].start()
+            print(f"🚀 Started {path} ({time.perf_counter() - started:.1f}s)")
+
+        launch("assistant")
+        running, hedged = 1, False
+        if hedge_after is not None and hedge_after <= 0:
+            launch("chat_completion")
+            running, hedged = 2, True
+
+        while running:
+            try:
+                timeout = hedge_after if not hedged and hedge_after is not None else None
+                path, notes = results.get(timeout=timeout)
+            except queue.Empty:
+                print(f"⏱️ Assistant slower than {hedge_after}s, hedging with chat completion")
+                launch("chat_completion")
+                running, hedged = running + 1, True
+                continue
+
+            running -= 1
+            threads.pop(path)
+            if notes:
+                stop.set()
+                elapsed = time.perf_counter() - started
+                self._cancel_assistant(assistant_run.get("run"), threads.get("assistant"))
+                return notes, path, elapsed
+            print(f"⚠️ {path} did not produce valid notes")
+            if not hedged:
+                launch("chat_completion")
+                running, hedged = running + 1, True
+
+        return None, None, time.perf_counter() - started
     
+    def _cancel_assistant(self, run: Any, thread: Optional[threading.Thread]):
+        """Cancel a still-running assistant run after the other path won."""
+        if thread is None:
+            return
+        if run is not None:
+            cancel_run(self.client, run.thread_id, run)
+            print(f"🛑 Cancelled losing assistant run {run.id}")
+        # If the run was not created yet, the assistant thread cancels it on its first event
+        thread.join(timeout=CANCEL_GRACE_SECONDS)
+
     def validate_notes(self, json_content: str) -> Optional[List[Note]]:
-        """Validate and parse notes JSON against Pydantic model."""
+        """Parse and validate a complete notes response in a single pass."""
         if not json_content:
             return None
-            
-        try:
-            # First try to parse directly
-            try:
-                data = json.loads(json_content)
-                notes = NotesCollection(**data)
-                return notes.notes
-            except (json.JSONDecodeError, ValidationError):
-                pass
-                
-            # If fails, try to extract JSON
-            extracted = self.extract_json(json_content)
-            if extracted:
-                data = json.loads(extracted)
-                notes = NotesCollection(**data)
-                return notes.notes
-                
-        except json.JSONDecodeError as e:
-            print(f"JSON error: {e}")
-        except ValidationError as e:
-            print(f"Validation error: {e}")
-            
-        return None
+        parser = NoteStreamParser()
+        parser.feed(json_content)
+        return parser.finish()
     
     @staticmethod
     def save_notes(notes: List[Note], filename: str = "exam_notes.json") -> bool:
@@ -245,27 +426,31 @@ class NoteGenerator:
                 print(f"   Page: {note.page_ref}")
             print("-"*50)
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate 10 structured exam notes")
+    parser.add_argument("--hedge", action="store_true",
+                        help="start the assistant and chat completion at once, keep the first valid result")
+    parser.add_argument("--hedge-after", type=float, metavar="SECONDS",
+                        help="start chat completion if the assistant has no valid notes after SECONDS")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    hedge_after = 0 if args.hedge else args.hedge_after
     try:
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = get_client()
         generator = NoteGenerator(client)
         
         print("🔄 Generating 10 structured exam notes...")
         
-        # Try assistant first, then chat completion
-        json_content = generator.generate_with_assistant() or generator.generate_with_chat_completion()
-        
-        if not json_content:
-            print("❌ Failed to generate notes")
-            return
-            
-        print("✅ Received response, validating...")
-        notes = generator.validate_notes(json_content)
+        # Assistant first; chat completion as fallback or hedge
+        notes, path, elapsed = generator.generate_notes(hedge_after)
         
         if not notes:
-            print("❌ Invalid notes format")
+            print(f"❌ Failed to generate valid notes ({elapsed:.1f}s)")
             return
             
+        print(f"✅ Valid notes from {path} in {elapsed:.1f}s")
         generator.print_notes(notes)
         
         if generator.save_notes(notes):
@@ -2,78 +2,194 @@
 """
 99 — Cleanup Script
 
-Удаляет ассистента OpenAI и все загруженные файлы, а также очищает файл .assistant.
+Удаляет ассистента OpenAI, все загруженные файлы и векторные хранилища,
+созданные 00_bootstrap.py, а также локальные файлы .assistant, assistant_info.json и upload_manifest.json.
 
-Usage: python scripts/99_cleanup.py
+Файлы и хранилища перебираются по всем страницам и удаляются параллельно
+(ограниченный пул потоков) с повтором при rate limit и сетевых ошибках.
+
+Usage: python scripts/99_cleanup.py [--dry-run] [--workers 8]
 """
 
 import os
 import sys
+import json
+import time
+import random
+import argparse
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from openai import OpenAI
+import openai
+from llm_client import get_client as shared_client, llm_mode
 
 load_dotenv()
 
+# Vector store name used by 00_bootstrap.py
+BOOTSTRAP_STORE_NAME = "TransformerPaperStore"
+LOCAL_ARTIFACTS = [".assistant", "assistant_info.json", "upload_manifest.json"]
+
+MAX_ATTEMPTS = 5
+BASE_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
 def get_client():
     api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+    if not api_key and llm_mode() != "replay":
         print("❌ Error: OPENAI_API_KEY not found")
         sys.exit(1)
-    return OpenAI(api_key=api_key)
+    return shared_client()
 
-def load_assistant_id():
+def load_assistant_info():
+    """Assistant id and vector store id from .assistant or assistant_info.json."""
+    info_file = Path("assistant_info.json")
+    if info_file.exists():
+        info = json.loads(info_file.read_text())
+        return info.get("id"), info.get("vector_store_id")
     assistant_file = Path(".assistant")
     if assistant_file.exists():
-        return assistant_file.read_text().strip()
-    return None
+        return assistant_file.read_text().strip(), None
+    return None, None
 
-def delete_assistant(client, assistant_id):
-    try:
-        print(f"🗑️ Deleting assistant: {assistant_id}")
-        client.beta.assistants.delete(assistant_id=assistant_id)
+def vector_stores_api(client):
+    # Newer SDKs moved vector stores out of beta
+    return client.vector_stores if hasattr(client, "vector_stores") else client.beta.vector_stores
+
+def retry_delay(error, attempt):
+    """Use the server's Retry-After if given, else exponential backoff with jitter."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_BACKOFF)
+        except ValueError:
+            pass
+    return min(BASE_BACKOFF * 2 ** attempt, MAX_BACKOFF) * random.uniform(0.5, 1.0)
+
+def delete_with_retry(delete, item_id):
+    """Returns True if deleted (or already gone), False after the last failed attempt."""
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            delete(item_id)
+            return True
+        except openai.NotFoundError:
+            return True
+        except RETRYABLE_ERRORS as e:
+            if attempt == MAX_ATTEMPTS - 1:
+                print(f"⚠️ Giving up on {item_id}: {e}")
+                return False
+            time.sleep(retry_delay(e, attempt))
+        except Exception as e:
+            print(f"⚠️ Failed to delete {item_id}: {e}")
+            return False
+    return False
+
+def delete_all(kind, items, delete, workers, dry_run):
+    """Delete items concurrently and print a throughput report. items: [(id, label)]"""
+    if not items:
+        print(f"ℹ️ No {kind} found.")
+        return
+    if dry_run:
+        print(f"🔍 Would delete {len(items)} {kind}:")
+        for item_id, label in items[:10]:
+            print(f"   - {item_id} ({label})")
+        if len(items) > 10:
+            print(f"   ... and {len(items) - 10} more")
+        return
+
+    print(f"🗑️ Deleting {len(items)} {kind} with {workers} workers...")
+    started = time.perf_counter()
+    deleted = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(delete_with_retry, delete, item_id) for item_id, _ in items]
+        for future in as_completed(futures):
+            if future.result():
+                deleted += 1
+            else:
+                failed += 1
+            done = deleted + failed
+            if done % 100 == 0:
+                print(f"   {done}/{len(items)}...")
+    elapsed = time.perf_counter() - started
+    print(f"✅ {deleted} {kind} deleted, {failed} failed in {elapsed:.1f}s "
+          f"({deleted / elapsed if elapsed else 0:.1f}/s)")
+
+def delete_assistant(client, assistant_id, dry_run):
+    if dry_run:
+        print(f"🔍 Would delete assistant: {assistant_id}")
+        return
+    print(f"🗑️ Deleting assistant: {assistant_id}")
+    if delete_with_retry(lambda item_id: client.beta.assistants.delete(assistant_id=item_id), assistant_id):
         print("✅ Assistant deleted.")
-    except Exception as e:
-        print(f"⚠️ Failed to delete assistant: {e}")
 
-def delete_all_files(client):
-    try:
-        print("📂 Fetching uploaded files...")
-        files = client.files.list().data
-        if not files:
-            print("ℹ️ No files found.")
-            return
-        for f in files:
-            print(f"🗑️ Deleting file: {f.id} ({f.filename})")
-            client.files.delete(f.id)
-        print("✅ All files deleted.")
-    except Exception as e:
-        print(f"⚠️ Failed to delete files: {e}")
+def list_files(client):
+    print("📂 Fetching uploaded files (all pages)...")
+    # Iterating the page object follows the pagination cursor
+    files = list(client.files.list(limit=100))
+    total_mb = sum(f.bytes or 0 for f in files) / 1024 / 1024
+    print(f"   Found {len(files)} files ({total_mb:.1f} MB)")
+    return [(f.id, f.filename) for f in files]
 
-def remove_local_artifacts():
-    assistant_file = Path(".assistant")
-    if assistant_file.exists():
-        assistant_file.unlink()
-        print("🧹 Removed .assistant file.")
-    else:
-        print("ℹ️ .assistant file not found.")
+def list_vector_stores(client, vector_store_id):
+    print("📂 Fetching vector stores (all pages)...")
+    stores = [
+        (store.id, store.name)
+        for store in vector_stores_api(client).list(limit=100)
+        if store.name == BOOTSTRAP_STORE_NAME or store.id == vector_store_id
+    ]
+    print(f"   Found {len(stores)} vector stores from 00_bootstrap.py")
+    return stores
+
+def remove_local_artifacts(dry_run):
+    for name in LOCAL_ARTIFACTS:
+        path = Path(name)
+        if not path.exists():
+            continue
+        if dry_run:
+            print(f"🔍 Would remove {name}")
+        else:
+            path.unlink()
+            print(f"🧹 Removed {name}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Delete the assistant, uploaded files and vector stores")
+    parser.add_argument("--dry-run", action="store_true", help="only show what would be deleted")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent delete requests")
+    return parser.parse_args()
 
 def main():
-    print("\n🧼 Cleanup Script")
+    args = parse_args()
+    print("\n🧼 Cleanup Script" + (" (dry run)" if args.dry_run else ""))
     print("=" * 50)
 
     client = get_client()
-    assistant_id = load_assistant_id()
+    # Deletes retry in delete_with_retry, so turn off the SDK's own retries for them
+    deleter = client.with_options(max_retries=0)
+    assistant_id, vector_store_id = load_assistant_info()
 
     if assistant_id:
-        delete_assistant(client, assistant_id)
+        delete_assistant(deleter, assistant_id, args.dry_run)
     else:
         print("ℹ️ No assistant ID found.")
 
-    delete_all_files(client)
-    remove_local_artifacts()
+    try:
+        stores = list_vector_stores(client, vector_store_id)
+        delete_all("vector stores", stores,
+                   lambda item_id: vector_stores_api(deleter).delete(item_id),
+                   args.workers, args.dry_run)
+    except Exception as e:
+        print(f"⚠️ Failed to delete vector stores: {e}")
+
+    try:
+        files = list_files(client)
+        delete_all("files", files, deleter.files.delete, args.workers, args.dry_run)
+    except Exception as e:
+        print(f"⚠️ Failed to delete files: {e}")
+
+    remove_local_artifacts(args.dry_run)
 
-    print("\n✅ Cleanup complete.")
+    print("\n✅ Dry run complete, nothing was deleted." if args.dry_run else "\n✅ Cleanup complete.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
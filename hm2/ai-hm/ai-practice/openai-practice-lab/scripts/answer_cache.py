@@ -0,0 +1,70 @@
+"""Local SQLite cache of assistant answers.
+
+Questions are normalized (case, punctuation, whitespace) and keyed by the
+assistant and vector store they were answered from, so a new vector store
+from 00_bootstrap.py never serves old answers. The bootstrap script also
+clears the cache whenever it uploads new material.
+"""
+
+import json
+import re
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+CACHE_FILE = "answer_cache.db"
+
+def normalize_question(question: str) -> str:
+    """'What is  Multi-Head attention?' -> 'what is multi head attention'"""
+    words = re.findall(r"\w+", question.lower())
+    return " ".join(words)
+
+def _to_json(value: Any) -> Any:
+    # Citations may contain SDK objects (e.g. file_citation)
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+class AnswerCache:
+    """Normalized question -> answer + citations, per assistant/vector store."""
+
+    def __init__(self, path: str = CACHE_FILE):
+        self.db = sqlite3.connect(path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                assistant_id TEXT NOT NULL,
+                vector_store_id TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                citations TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (assistant_id, vector_store_id, question)
+            )
+        """)
+
+    def get(self, assistant_id: str, vector_store_id: str, question: str) -> Optional[Tuple[str, List[Dict]]]:
+        row = self.db.execute(
+            "SELECT answer, citations FROM answers "
+            "WHERE assistant_id = ? AND vector_store_id = ? AND question = ?",
+            (assistant_id, vector_store_id or "", normalize_question(question))
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put(self, assistant_id: str, vector_store_id: str, question: str,
+            answer: str, citations: List[Dict]):
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)",
+                (assistant_id, vector_store_id or "", normalize_question(question),
+                 answer, json.dumps(citations, default=_to_json), time.time())
+            )
+
+    def clear(self) -> int:
+        """Drop every cached answer. Returns how many were removed."""
+        with self.db:
+            return self.db.execute("DELETE FROM answers").rowcount
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,106 @@
+"""Shared helper for executing an assistant run on a thread.
+
+Runs are streamed when the installed openai SDK supports it, so answer text
+can be shown as it arrives. Older SDKs fall back to polling with a backoff
+that starts fast and slows down for long runs.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple
+import openai
+from openai import OpenAI
+
+TERMINAL_STATUSES = ["completed", "failed", "cancelling", "cancelled", "expired", "incomplete", "requires_action"]
+
+# Polling fallback: first check after 0.25s, then slow down up to 2s
+MIN_POLL_INTERVAL = 0.25
+MAX_POLL_INTERVAL = 2.0
+POLL_BACKOFF = 1.5
+
+@dataclass
+class RunTimings:
+    """Latency of one run, in seconds."""
+    started_at: float
+    first_token: Optional[float] = None
+    total: Optional[float] = None
+    streamed: bool = False
+    polls: int = 0
+
+    def summary(self) -> str:
+        first = f"{self.first_token:.2f}s" if self.first_token is not None else "n/a"
+        mode = "streamed" if self.streamed else f"polled {self.polls}x"
+        return f"⏱️ First token: {first}, total: {self.total:.2f}s ({mode})"
+
+def execute_run(client: OpenAI, thread_id: str, assistant_id: str,
+                on_text: Optional[Callable[[str], None]] = None,
+                should_stop: Optional[Callable[[], bool]] = None,
+                on_start: Optional[Callable[[Any], None]] = None) -> Tuple[Any, RunTimings]:
+    """Run the assistant on the thread and wait for it to finish.
+
+    on_text is called with each piece of answer text as it is streamed.
+    on_start is called with the run as soon as it exists, so another thread
+    can cancel it with cancel_run.
+    If should_stop returns True while waiting, the run is cancelled.
+    Returns the final run and its timings.
+    """
+    timings = RunTimings(started_at=time.perf_counter())
+    should_stop = should_stop or (lambda: False)
+    on_start = on_start or (lambda run: None)
+
+    if hasattr(client.beta.threads.runs, "stream"):
+        run = _stream_run(client, thread_id, assistant_id, on_text, should_stop, on_start, timings)
+    else:
+        run = _poll_run(client, thread_id, assistant_id, should_stop, on_start, timings)
+
+    timings.total = time.perf_counter() - timings.started_at
+    if run.status != "completed":
+        print(f"Run ended with status: {run.status}")
+        if run.status == "failed" and getattr(run, "last_error", None):
+            print(f"Error details: {run.last_error}")
+    return run, timings
+
+def cancel_run(client: OpenAI, thread_id: str, run: Any) -> Any:
+    try:
+        return client.beta.threads.runs.cancel(run_id=run.id, thread_id=thread_id)
+    except openai.BadRequestError:
+        # Already finished or being cancelled (e.g. from another thread)
+        return run
+    except Exception as e:
+        print(f"Could not cancel run {run.id}: {e}")
+        return run
+
+def _stream_run(client: OpenAI, thread_id: str, assistant_id: str,
+                on_text: Optional[Callable[[str], None]], should_stop: Callable[[], bool],
+                on_start: Callable[[Any], None], timings: RunTimings) -> Any:
+    timings.streamed = True
+    with client.beta.threads.runs.stream(thread_id=thread_id, assistant_id=assistant_id) as stream:
+        for event in stream:
+            if event.event == "thread.run.created":
+                on_start(event.data)
+            if should_stop() and stream.current_run:
+                return cancel_run(client, thread_id, stream.current_run)
+            if event.event != "thread.message.delta":
+                continue
+            for block in event.data.delta.content or []:
+                if block.type == "text" and block.text and block.text.value:
+                    if timings.first_token is None:
+                        timings.first_token = time.perf_counter() - timings.started_at
+                    if on_text:
+                        on_text(block.text.value)
+        return stream.get_final_run()
+
+def _poll_run(client: OpenAI, thread_id: str, assistant_id: str,
+              should_stop: Callable[[], bool], on_start: Callable[[Any], None],
+              timings: RunTimings) -> Any:
+    run = client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant_id)
+    on_start(run)
+    delay = MIN_POLL_INTERVAL
+    while run.status not in TERMINAL_STATUSES:
+        if should_stop():
+            return cancel_run(client, thread_id, run)
+        time.sleep(delay)
+        delay = min(delay * POLL_BACKOFF, MAX_POLL_INTERVAL)
+        run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
+        timings.polls += 1
+    return run
@@ -0,0 +1,261 @@
+"""Shared OpenAI client for the scripts.
+
+Every script gets one pooled HTTP client per process: keep-alive connections,
+explicit timeouts and SDK retries (exponential backoff, Retry-After honoured).
+
+LLM_MODE switches the transport for offline benchmarks:
+- record: requests go to the API and every response, including streamed
+  chunks and their timing, is saved to LLM_CASSETTE_DIR
+- replay: responses are served from LLM_CASSETTE_DIR with their recorded
+  latency (scaled by LLM_REPLAY_SPEED, 0 = no delay) and no network access;
+  recorded 429/5xx responses are replayed too and retried like the originals
+
+Usage:
+    LLM_MODE=record python scripts/02_generate_notes.py
+    LLM_MODE=replay python scripts/02_generate_notes.py
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import httpx
+from openai import OpenAI
+
+CASSETTE_DIR = "llm_cassettes"
+
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 30.0
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 60.0
+MAX_RETRIES = 3
+# Statuses the SDK retries; replayed ones get their backoff scaled by LLM_REPLAY_SPEED
+RETRY_STATUSES = {408, 409, 429}
+# The SDK's first backoff step, used when a recorded error had no Retry-After
+DEFAULT_RETRY_AFTER = 0.5
+
+def llm_mode() -> str:
+    return os.getenv("LLM_MODE", "live").lower()
+
+class Cassette:
+    """Recorded responses on disk, one JSON file per distinct request.
+
+    Identical requests (e.g. polling a run) are recorded in order and replayed
+    in the same order; the last response repeats once they run out.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._cursors: Dict[str, int] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(request: httpx.Request) -> str:
+        body = request.read()
+        # Multipart uploads use a random boundary on every request
+        content_type = request.headers.get("content-type", "")
+        if "boundary=" in content_type:
+            body = body.replace(content_type.split("boundary=")[1].encode(), b"boundary")
+        digest = hashlib.sha256(f"{request.method} {request.url.path}?{request.url.query.decode()}\n".encode())
+        digest.update(body)
+        return digest.hexdigest()[:32]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load(self, key: str) -> List[Dict]:
+        if not os.path.exists(self._path(key)):
+            return []
+        with open(self._path(key)) as f:
+            return json.load(f)
+
+    def next(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entries = self._load(key)
+            if not entries:
+                return None
+            position = self._cursors.get(key, 0)
+            self._cursors[key] = position + 1
+            return entries[min(position, len(entries) - 1)]
+
+    def save(self, key: str, entry: Dict):
+        with self._lock:
+            # Re-recording starts each request's sequence from scratch
+            entries = self._load(key) if key in self._cursors else []
+            self._cursors[key] = len(entries) + 1
+            with open(self._path(key), "w") as f:
+                json.dump(entries + [entry], f)
+
+class RecordingStream(httpx.SyncByteStream):
+    """Passes response chunks through and records them with their inter-chunk delays."""
+
+    def __init__(self, stream: httpx.SyncByteStream, on_complete):
+        self.stream = stream
+        # One iterator, so close() can carry on where the reader stopped
+        self.iterator = iter(stream)
+        self.on_complete = on_complete
+        self.chunks = []
+        self.completed = False
+        self.closed = False
+        self.last = time.perf_counter()
+
+    def _record(self, chunk: bytes):
+        now = time.perf_counter()
+        self.chunks.append([round(now - self.last, 4), base64.b64encode(chunk).decode()])
+        self.last = now
+
+    def __iter__(self):
+        for chunk in self.iterator:
+            self._record(chunk)
+            yield chunk
+        self.completed = True
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        # Newer SDKs stop reading a stream at [DONE] and close it, so read the rest ourselves
+        if not self.completed:
+            try:
+                for chunk in self.iterator:
+                    self._record(chunk)
+                self.completed = True
+            except httpx.HTTPError:
+                pass
+        self.stream.close()
+        # Responses cut off by an error are not worth replaying
+        if self.completed:
+            self.on_complete(self.chunks)
+
+class ReplayStream(httpx.SyncByteStream):
+    def __init__(self, chunks: List, speed: float):
+        self.chunks = chunks
+        self.speed = speed
+
+    def __iter__(self):
+        for delay, data in self.chunks:
+            if self.speed:
+                time.sleep(delay * self.speed)
+            yield base64.b64decode(data)
+
+class RecordReplayTransport(httpx.BaseTransport):
+    """Records responses from the wrapped transport, or replays them offline."""
+
+    def __init__(self, mode: str, cassette: Cassette, transport: Optional[httpx.BaseTransport] = None,
+                 speed: float = 1.0):
+        self.mode = mode
+        self.cassette = cassette
+        self.transport = transport
+        self.speed = speed
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key = Cassette.key(request)
+        if self.mode == "replay":
+            return self._replay(key, request)
+
+        started = time.perf_counter()
+        response = self.transport.handle_request(request)
+        entry = {
+            "request": f"{request.method} {request.url.path}",
+            "status": response.status_code,
+            "headers": response.headers.multi_items(),
+            "latency": round(time.perf_counter() - started, 4),
+        }
+        if response.status_code >= 400:
+            # The SDK closes error responses it retries without reading them, so save them now
+            try:
+                raw = b"".join(response.stream)
+            finally:
+                response.close()
+            self.cassette.save(key, {**entry, "chunks": [[0, base64.b64encode(raw).decode()]]})
+            return httpx.Response(response.status_code, headers=response.headers,
+                                  stream=httpx.ByteStream(raw), extensions=response.extensions, request=request)
+
+        def save(chunks):
+            self.cassette.save(key, {**entry, "chunks": chunks})
+
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=RecordingStream(response.stream, save),
+            extensions=response.extensions,
+            request=request,
+        )
+
+    def _replay(self, key: str, request: httpx.Request) -> httpx.Response:
+        entry = self.cassette.next(key)
+        if entry is None:
+            # A plain error response, so the SDK fails at once instead of retrying
+            message = f"No recorded response for {request.method} {request.url.path} in {self.cassette.directory}"
+            return httpx.Response(404, headers={"x-should-retry": "false"},
+                                  json={"error": {"message": message, "type": "replay_miss"}}, request=request)
+        if self.speed:
+            time.sleep(entry["latency"] * self.speed)
+        headers = httpx.Headers(entry["headers"])
+        if entry["status"] in RETRY_STATUSES or entry["status"] >= 500:
+            headers["retry-after-ms"] = str(self._retry_after(headers) * 1000)
+        return httpx.Response(
+            entry["status"],
+            headers=headers,
+            stream=ReplayStream(entry["chunks"], self.speed),
+            request=request,
+        )
+
+    def _retry_after(self, headers: httpx.Headers) -> float:
+        """The recorded Retry-After (or the SDK's first backoff step), scaled by the replay speed."""
+        delay = DEFAULT_RETRY_AFTER
+        for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+            try:
+                delay = float(headers[name]) * scale
+                break
+            except (KeyError, ValueError):
+                continue
+        # The SDK ignores 0 and falls back to its own backoff, so keep it just above
+        return max(delay * self.speed, 0.001)
+
+    def close(self):
+        if self.transport:
+            self.transport.close()
+
+def build_http_client() -> httpx.Client:
+    """Pooled keep-alive HTTP client, wrapped for record/replay when LLM_MODE asks for it."""
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(float(os.getenv("LLM_TIMEOUT", READ_TIMEOUT)), connect=CONNECT_TIMEOUT)
+    mode = llm_mode()
+    if mode not in ("record", "replay"):
+        return httpx.Client(limits=limits, timeout=timeout)
+
+    # With a custom transport the pool limits have to be set on the transport itself
+    cassette = Cassette(os.getenv("LLM_CASSETTE_DIR", CASSETTE_DIR))
+    transport = RecordReplayTransport(
+        mode,
+        cassette,
+        transport=httpx.HTTPTransport(limits=limits) if mode == "record" else None,
+        speed=float(os.getenv("LLM_REPLAY_SPEED", 1.0)),
+    )
+    return httpx.Client(transport=transport, timeout=timeout)
+
+@lru_cache(maxsize=None)
+def get_client() -> OpenAI:
+    """Process-wide OpenAI client; safe to share between threads."""
+    replaying = llm_mode() == "replay"
+    if replaying:
+        print(f"🎞️ Replaying recorded responses from {os.getenv('LLM_CASSETTE_DIR', CASSETTE_DIR)}/")
+    return OpenAI(
+        # Replay never reaches the API, so no key is needed
+        api_key=os.getenv("OPENAI_API_KEY") or ("replay" if replaying else None),
+        http_client=build_http_client(),
+        # Kept in replay too, so recorded rate limits and 5xx are retried past
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", MAX_RETRIES)),
+    )
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Local offline retrieval index for the study PDF.
+
+Extracts the PDF page by page, splits pages into overlapping chunks (keeping
+page numbers) and builds two indexes saved as .npy files that are memory-mapped
+on load:
+- BM25 postings (term -> chunks with term frequency)
+- a NumPy matrix of L2-normalized hashed TF-IDF vectors for cosine similarity
+
+Search combines both scores and returns the top-k passages with their pages,
+without any network call.
+
+Usage:
+    python scripts/local_index.py build [data/mathbook.pdf]
+    python scripts/local_index.py query "What is multi-head attention?"
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+from pypdf import PdfReader
+
+INDEX_DIR = "local_index"
+PDF_PATH = "data/mathbook.pdf"
+
+CHUNK_WORDS = 120
+CHUNK_OVERLAP = 30
+VECTOR_DIM = 4096
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Weight of the BM25 score vs. cosine similarity in the hybrid score
+BM25_WEIGHT = 0.5
+
+TOKEN_RE = re.compile(r"\w+")
+
+@dataclass
+class Passage:
+    page: int
+    text: str
+    score: float
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def extract_chunks(pdf_path: str) -> List[Dict]:
+    """Split every page into overlapping word windows: [{"page": 1, "text": ...}]"""
+    chunks = []
+    for page_number, page in enumerate(PdfReader(pdf_path).pages, 1):
+        words = (page.extract_text() or "").split()
+        step = CHUNK_WORDS - CHUNK_OVERLAP
+        for start in range(0, max(len(words) - CHUNK_OVERLAP, 1), step):
+            text = " ".join(words[start:start + CHUNK_WORDS])
+            if text:
+                chunks.append({"page": page_number, "text": text})
+    return chunks
+
+def hashed_vector(term_counts: Counter, idf: Dict[str, float]) -> np.ndarray:
+    """Sublinear TF-IDF vector using the hashing trick (crc32 is stable across runs)."""
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    for term, count in term_counts.items():
+        vector[zlib.crc32(term.encode()) % VECTOR_DIM] += (1 + np.log(count)) * idf.get(term, 0.0)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def build_index(pdf_path: str = PDF_PATH, index_dir: str = INDEX_DIR) -> Dict:
+    """Build (or rebuild) the index for pdf_path. Returns the index metadata."""
+    started = time.perf_counter()
+    chunks = extract_chunks(pdf_path)
+    if not chunks:
+        raise ValueError(f"No text found in {pdf_path}")
+    counts = [Counter(tokenize(chunk["text"])) for chunk in chunks]
+
+    vocab = {}
+    for chunk_counts in counts:
+        for term in chunk_counts:
+            vocab.setdefault(term, len(vocab))
+    doc_freq = np.zeros(len(vocab), dtype=np.float32)
+    for chunk_counts in counts:
+        for term in chunk_counts:
+            doc_freq[vocab[term]] += 1
+    n = len(chunks)
+    idf = np.log(1 + (n - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+
+    # BM25 postings grouped by term: term_ptr[t]:term_ptr[t+1] slices doc_ids/tf
+    postings = [[] for _ in vocab]
+    for chunk_id, chunk_counts in enumerate(counts):
+        for term, count in chunk_counts.items():
+            postings[vocab[term]].append((chunk_id, count))
+    term_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+    term_ptr[1:] = np.cumsum([len(p) for p in postings])
+    doc_ids = np.array([chunk_id for p in postings for chunk_id, _ in p], dtype=np.int32)
+    tf = np.array([count for p in postings for _, count in p], dtype=np.float32)
+    doc_len = np.array([sum(c.values()) for c in counts], dtype=np.float32)
+
+    idf_by_term = {term: float(idf[i]) for term, i in vocab.items()}
+    vectors = np.stack([hashed_vector(c, idf_by_term) for c in counts])
+
+    os.makedirs(index_dir, exist_ok=True)
+    for name, array in [("term_ptr", term_ptr), ("doc_ids", doc_ids), ("tf", tf),
+                        ("doc_len", doc_len), ("idf", idf), ("vectors", vectors)]:
+        np.save(os.path.join(index_dir, f"{name}.npy"), array)
+    with open(os.path.join(index_dir, "vocab.json"), "w") as f:
+        json.dump(vocab, f)
+    with open(os.path.join(index_dir, "chunks.json"), "w") as f:
+        json.dump(chunks, f)
+    meta = {
+        "source": pdf_path,
+        "sha256": file_sha256(pdf_path),
+        "chunks": n,
+        "terms": len(vocab),
+        "avg_doc_len": float(doc_len.mean()),
+        "built_at": time.time(),
+    }
+    with open(os.path.join(index_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    print(f"✅ Indexed {n} chunks, {len(vocab)} terms in {time.perf_counter() - started:.2f}s → {index_dir}/")
+    return meta
+
+class LocalIndex:
+    """Read-only view of a built index; arrays are memory-mapped."""
+
+    def __init__(self, index_dir: str = INDEX_DIR):
+        if not os.path.exists(os.path.join(index_dir, "meta.json")):
+            raise FileNotFoundError("Local index not found. Run: python scripts/local_index.py build")
+        load = lambda name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+        self.term_ptr = load("term_ptr")
+        self.doc_ids = load("doc_ids")
+        self.tf = load("tf")
+        self.doc_len = load("doc_len")
+        self.idf = load("idf")
+        self.vectors = load("vectors")
+        with open(os.path.join(index_dir, "vocab.json")) as f:
+            self.vocab = json.load(f)
+        with open(os.path.join(index_dir, "chunks.json")) as f:
+            self.chunks = json.load(f)
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+
+    @property
+    def index_id(self) -> str:
+        """Identifies the indexed material (for caches)."""
+        return "local:" + self.meta["sha256"][:16]
+
+    def bm25_scores(self, terms: List[str]) -> np.ndarray:
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        avg_len = self.meta["avg_doc_len"]
+        for term in set(terms):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.tf[start:end]
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[docs] / avg_len)
+            scores[docs] += self.idf[term_id] * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    def cosine_scores(self, terms: List[str]) -> np.ndarray:
+        idf = {term: float(self.idf[self.vocab[term]]) for term in terms if term in self.vocab}
+        return self.vectors @ hashed_vector(Counter(terms), idf)
+
+    def search(self, query: str, k: int = 4) -> List[Passage]:
+        terms = tokenize(query)
+        bm25 = self.bm25_scores(terms)
+        cosine = self.cosine_scores(terms)
+        if bm25.max() > 0:
+            bm25 = bm25 / bm25.max()
+        scores = BM25_WEIGHT * bm25 + (1 - BM25_WEIGHT) * cosine
+        top = np.argsort(-scores)[:k]
+        return [
+            Passage(page=self.chunks[i]["page"], text=self.chunks[i]["text"], score=float(scores[i]))
+            for i in top if scores[i] > 0
+        ]
+
+def build_context(passages: List[Passage], max_chars: int = 3000) -> str:
+    """Format passages with page labels, stopping at max_chars.
+
+    The best passage is truncated rather than dropped when it alone is too long.
+    """
+    parts, used = [], 0
+    for passage in passages:
+        part = f"[Page {passage.page}]\n{passage.text}"
+        if used + len(part) > max_chars:
+            if not parts:
+                parts.append(part[:max_chars])
+            break
+        parts.append(part)
+        used += len(part)
+    return "\n\n".join(parts)
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("build", "query"):
+        print(__doc__)
+        sys.exit(1)
+
+    if sys.argv[1] == "build":
+        pdf_path = sys.argv[2] if len(sys.argv) > 2 else PDF_PATH
+        if not os.path.exists(pdf_path):
+            print(f"❌ Study material not found at {pdf_path}")
+            sys.exit(1)
+        build_index(pdf_path)
+        return
+
+    query = " ".join(sys.argv[2:])
+    index = LocalIndex()
+    started = time.perf_counter()
+    passages = index.search(query)
+    print(f"🔎 {len(passages)} passages in {(time.perf_counter() - started) * 1000:.1f} ms")
+    for passage in passages:
+        print(f"\n📄 Page {passage.page} (score {passage.score:.3f})\n{passage.text[:300]}")
+
+if __name__ == "__main__":
+    main()